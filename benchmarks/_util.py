@@ -0,0 +1,20 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Importing this module puts the repository root on ``sys.path``, so the scripts
+time the working tree rather than an installed mockredis.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def timed(label, func, *args):
+    """
+    Call ``func`` with ``args`` and print how long it took.
+    """
+    start = time.time()
+    func(*args)
+    print("  {:<24} {:8.3f}s".format(label, time.time() - start))
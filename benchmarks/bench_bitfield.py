@@ -0,0 +1,39 @@
+"""
+Time BITFIELD INCRBY on byte aligned and unaligned counters.
+
+Usage:
+
+    python benchmarks/bench_bitfield.py [operations]
+"""
+import sys
+
+from _util import timed  # also puts the repository root on sys.path
+from mockredis import MockRedis
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    counters = 4096
+    redis = MockRedis()
+    print("{} INCRBY operations over {} counters".format(operations, counters))
+
+    def commands(fmt, width):
+        for i in range(operations):
+            redis.bitfield("counters").incrby(fmt, (i % counters) * width, 1).execute()
+
+    def batched(fmt, width, size=1000):
+        for start in range(0, operations, size):
+            operation = redis.bitfield("counters")
+            for i in range(start, min(start + size, operations)):
+                operation.incrby(fmt, (i % counters) * width, 1)
+            operation.execute()
+
+    for fmt, width in [("u8", 8), ("i16", 16), ("u32", 32), ("u12", 12)]:
+        redis.flushdb()
+        timed("{} one per command".format(fmt), commands, fmt, width)
+        redis.flushdb()
+        timed("{} 1000 per command".format(fmt), batched, fmt, width)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Time queuing and executing large pipelines.
+
+Usage:
+
+    python benchmarks/bench_pipeline.py [commands]
+"""
+import sys
+
+from _util import timed  # also puts the repository root on sys.path
+from mockredis import MockRedis
+
+
+def main():
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    redis = MockRedis()
+    print("{} commands per pipeline".format(commands))
+
+    def load(command):
+        pipeline = redis.pipeline()
+        for i in range(commands):
+            command(pipeline, i)
+        pipeline.execute()
+
+    redis.flushdb()
+    timed("set", load, lambda pipeline, i: pipeline.set(i, i))
+    timed("get", load, lambda pipeline, i: pipeline.get(i))
+    timed("hset", load, lambda pipeline, i: pipeline.hset("hash", i, i))
+    timed("mixed", load, lambda pipeline, i: pipeline.incr(i).sadd("set", i).get(i))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Time passing lists between scripts and redis.call, which needs Lua support.
+
+Usage:
+
+    python benchmarks/bench_script.py [elements] [runs]
+"""
+import sys
+
+from _util import timed  # also puts the repository root on sys.path
+from mockredis import MockRedis
+from mockredis.script import Script
+
+
+def main():
+    elements = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    try:
+        Script._import_lua()
+    except RuntimeError:
+        sys.exit("Lua is not installed; install mockredispy[lua]")
+
+    redis = MockRedis(load_lua_dependencies=False)
+    redis.rpush("list", *range(elements))
+    redis.hmset("hash", dict(("field{}".format(i), i) for i in range(elements)))
+    print("{} runs over {} elements".format(runs, elements))
+
+    def run(script, *keys):
+        for _ in range(runs):
+            script(keys=keys)
+
+    timed("lrange into script", run,
+          redis.register_script("return #redis.call('LRANGE', KEYS[1], 0, -1)"), "list")
+    timed("lrange through script", run,
+          redis.register_script("return redis.call('LRANGE', KEYS[1], 0, -1)"), "list")
+    timed("hgetall through script", run,
+          redis.register_script("return redis.call('HGETALL', KEYS[1])"), "hash")
+
+
+if __name__ == "__main__":
+    main()
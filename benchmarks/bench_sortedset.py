@@ -0,0 +1,82 @@
+"""
+Compare the skip list backed SortedSet against the previous bisect/list
+implementation.
+
+Usage:
+
+    python benchmarks/bench_sortedset.py [size]
+"""
+from bisect import bisect_left
+from random import random, sample
+import sys
+
+from _util import timed  # also puts the repository root on sys.path
+from mockredis.sortedset import SortedSet
+
+
+class BisectSortedSet(object):
+    """
+    The previous implementation: a sorted list of (score, member) pairs.
+    """
+    def __init__(self):
+        self._scores = []
+        self._members = {}
+
+    def insert(self, member, score):
+        found = self.remove(member)
+        index = bisect_left(self._scores, (score, member))
+        self._scores.insert(index, (score, member))
+        self._members[member] = score
+        return not found
+
+    def remove(self, member):
+        if member not in self._members:
+            return False
+        score = self._members.pop(member)
+        del self._scores[bisect_left(self._scores, (score, member))]
+        return True
+
+    def rank(self, member):
+        return bisect_left(self._scores, (self._members[member], member))
+
+    def range(self, start, end):
+        return self._scores[start:end + 1]
+
+
+def run(factory, size):
+    zset = factory()
+    members = ["member:{}".format(i) for i in range(size)]
+    scores = [random() for _ in range(size)]
+    probes = sample(members, min(size, 10000))
+
+    def insert():
+        for member, score in zip(members, scores):
+            zset.insert(member, score)
+
+    def rank():
+        for member in probes:
+            zset.rank(member)
+
+    def range_():
+        for i in range(0, size, max(1, size // 10000)):
+            zset.range(i, i + 10)
+
+    def remove():
+        for member in probes:
+            zset.remove(member)
+
+    timed("insert", insert)
+    timed("rank", rank)
+    timed("range", range_)
+    timed("remove", remove)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    for name, factory in [("bisect list", BisectSortedSet), ("skip list", SortedSet)]:
+        print("{} ({} members)".format(name, size))
+        run(factory, size)
+
+
+if __name__ == "__main__":
+    main()
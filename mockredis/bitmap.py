@@ -0,0 +1,246 @@
+"""
+Helpers for strings used as bitmaps: bit counting and the integer fields of BITFIELD.
+"""
+from binascii import hexlify, unhexlify
+import struct
+import sys
+
+from mockredis.exceptions import ResponseError
+
+if sys.version_info >= (3, 0):
+    long = int
+
+
+def bytes_to_int(data):
+    """
+    Convert ``data`` (a bytes-like object) to an integer, most significant byte first.
+    """
+    if not data:
+        return 0
+    if hasattr(int, 'from_bytes'):
+        return int.from_bytes(data, 'big')
+    return int(hexlify(data), 16)
+
+
+def int_to_bytes(number, length):
+    """
+    Convert a non-negative integer to ``length`` bytes, most significant byte first.
+    """
+    if hasattr(number, 'to_bytes'):
+        return number.to_bytes(length, 'big')
+    return unhexlify('%0*x' % (2 * length, number))
+
+
+def popcount(data):
+    """
+    Count the set bits in ``data`` (a bytes-like object).
+    """
+    number = bytes_to_int(data)
+    if hasattr(number, 'bit_count'):
+        return number.bit_count()
+    return bin(number).count('1')
+
+
+# Dictionary from (signed, width) to the struct format of byte aligned fields
+# of that type, which are read and written without any bit twiddling
+_ALIGNED_FORMATS = {
+    (False, 8): struct.Struct('>B'),
+    (False, 16): struct.Struct('>H'),
+    (False, 32): struct.Struct('>I'),
+    (True, 8): struct.Struct('>b'),
+    (True, 16): struct.Struct('>h'),
+    (True, 32): struct.Struct('>i'),
+    (True, 64): struct.Struct('>q'),
+}
+
+
+def parse_type(fmt):
+    """
+    Parse a field type such as ``u8`` or ``i16`` into (signed, width).
+    """
+    if not isinstance(fmt, str):
+        fmt = fmt.decode('utf-8')
+    try:
+        signed = {'i': True, 'u': False}[fmt[:1].lower()]
+        width = int(fmt[1:])
+    except (KeyError, ValueError):
+        width = 0
+    if not 0 < width <= (64 if signed else 63):
+        raise ResponseError("Invalid bitfield type. Use something like i16 u8. "
+                            "Note that u64 is not supported but i64 is.")
+    return signed, width
+
+
+def parse_offset(offset, width):
+    """
+    Parse a bit offset, where ``#N`` means the Nth field of ``width`` bits.
+    """
+    if not isinstance(offset, (int, long)):
+        if not isinstance(offset, str):
+            offset = offset.decode('utf-8')
+        try:
+            offset = int(offset[1:]) * width if offset.startswith('#') else int(offset)
+        except ValueError:
+            offset = -1
+    if offset < 0:
+        raise ResponseError("bit offset is not an integer or out of range")
+    return offset
+
+
+# Number of parsed fields kept by get_field
+FIELD_CACHE_SIZE = 65536
+
+# Dictionary from (type, offset) as given to BITFIELD to the parsed Field
+_field_cache = {}
+
+
+def get_field(fmt, offset):
+    """
+    Return the Field for a type such as ``u8`` and an offset such as ``16`` or ``#2``.
+
+    Fields are cached, since counters tend to be updated over and over.
+    """
+    try:
+        return _field_cache[fmt, offset]
+    except KeyError:
+        pass
+    signed, width = parse_type(fmt)
+    field = Field(signed, width, parse_offset(offset, width))
+    if len(_field_cache) >= FIELD_CACHE_SIZE:
+        _field_cache.clear()
+    _field_cache[fmt, offset] = field
+    return field
+
+
+class Field(object):
+    """
+    A field of one type at one offset of a bitmap.
+    """
+    __slots__ = ("signed", "width", "offset", "minimum", "maximum", "_aligned")
+
+    def __init__(self, signed, width, offset):
+        self.signed = signed
+        self.width = width
+        self.offset = offset
+        if signed:
+            self.minimum, self.maximum = -(1 << (width - 1)), (1 << (width - 1)) - 1
+        else:
+            self.minimum, self.maximum = 0, (1 << width) - 1
+        self._aligned = _ALIGNED_FORMATS.get((signed, width)) if offset % 8 == 0 else None
+
+    def get(self, bits):
+        """
+        Read the field from ``bits`` (a bytearray); bits past the end are zero.
+        """
+        first, last = self.offset // 8, (self.offset + self.width - 1) // 8
+        if self._aligned is not None and last < len(bits):
+            return self._aligned.unpack_from(bits, first)[0]
+        chunk = bits[first:last + 1]
+        chunk += b"\x00" * (last + 1 - first - len(chunk))
+        value = bytes_to_int(chunk) >> ((last + 1) * 8 - self.offset - self.width)
+        value &= (1 << self.width) - 1
+        if self.signed and value > self.maximum:
+            value -= 1 << self.width
+        return value
+
+    def set(self, bits, value):
+        """
+        Write the (in range) ``value`` to ``bits``, extending it as needed.
+        """
+        first, last = self.offset // 8, (self.offset + self.width - 1) // 8
+        if last >= len(bits):
+            bits.extend(b"\x00" * (last + 1 - len(bits)))
+        if self._aligned is not None:
+            self._aligned.pack_into(bits, first, value)
+            return
+        shift = (last + 1) * 8 - self.offset - self.width
+        mask = ((1 << self.width) - 1) << shift
+        number = bytes_to_int(bits[first:last + 1])
+        number = (number & ~mask) | ((value << shift) & mask)
+        bits[first:last + 1] = int_to_bytes(number, last + 1 - first)
+
+    def overflow(self, value, overflow):
+        """
+        Bring ``value`` into range as the OVERFLOW mode says, or return None to FAIL.
+        """
+        if self.minimum <= value <= self.maximum:
+            return value
+        if overflow == b'SAT':
+            return self.minimum if value < self.minimum else self.maximum
+        if overflow == b'FAIL':
+            return None
+        value &= (1 << self.width) - 1
+        if self.signed and value > self.maximum:
+            value -= 1 << self.width
+        return value
+
+
+class MockBitFieldOperation(object):
+    """
+    Imitate redis-py's BitFieldOperation: build a BITFIELD command up and
+    run it against a MockRedis with ``execute``.
+    """
+
+    def __init__(self, mock_redis, key, default_overflow=None):
+        self.mock_redis = mock_redis
+        self.key = key
+        self._default_overflow = default_overflow
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the state of the instance to when it was constructed
+        """
+        self.operations = []
+        self._last_overflow = 'WRAP'
+        self.overflow(self._default_overflow or self._last_overflow)
+
+    def overflow(self, overflow):
+        """
+        Update the overflow algorithm of successive INCRBY operations
+        """
+        overflow = overflow.upper()
+        if overflow != self._last_overflow:
+            self._last_overflow = overflow
+            self.operations.append(('OVERFLOW', overflow))
+        return self
+
+    def incrby(self, fmt, offset, increment, overflow=None):
+        """
+        Increment a bitfield by a given amount.
+        """
+        if overflow is not None:
+            self.overflow(overflow)
+
+        self.operations.append(('INCRBY', fmt, offset, increment))
+        return self
+
+    def get(self, fmt, offset):
+        """
+        Get the value of a given bitfield.
+        """
+        self.operations.append(('GET', fmt, offset))
+        return self
+
+    def set(self, fmt, offset, value):
+        """
+        Set the value of a given bitfield.
+        """
+        self.operations.append(('SET', fmt, offset, value))
+        return self
+
+    @property
+    def command(self):
+        cmd = ['BITFIELD', self.key]
+        for ops in self.operations:
+            cmd.extend(ops)
+        return cmd
+
+    def execute(self):
+        """
+        Execute the operation(s) in a single BITFIELD command. The return value
+        is a list of values corresponding to each operation.
+        """
+        operations = self.operations
+        self.reset()
+        return self.mock_redis._bitfield(self.key, operations)
@@ -1,20 +1,26 @@
 from __future__ import division
-from collections import defaultdict
-from copy import deepcopy
+from collections import OrderedDict, defaultdict, deque
 from itertools import chain
-from datetime import datetime, timedelta
+from datetime import timedelta
 from hashlib import sha1
-from operator import add
+from heapq import heapify, heappop, heappush
+from operator import add, and_, or_, xor
 from random import choice, sample
-import re
 import sys
+import threading
 import time
-import fnmatch
 
+from mockredis.bitmap import (
+    MockBitFieldOperation, bytes_to_int, get_field, int_to_bytes, popcount,
+)
 from mockredis.clock import SystemClock
 from mockredis.lock import MockRedisLock
 from mockredis.exceptions import RedisError, ResponseError, WatchError
+from mockredis.keyspace import KeySpace
+from mockredis.pattern import compile_pattern, literal_prefix
 from mockredis.pipeline import MockRedisPipeline
+from mockredis.pubsub import MockRedisPubSub
+from mockredis.quicklist import QuickList
 from mockredis.script import Script
 from mockredis.sortedset import SortedSet
 
@@ -29,36 +35,88 @@ class MockRedis(object):
     """
     A Mock for a redis-py Redis object
 
-    Expire functionality must be explicitly
-    invoked using do_expire(time). Automatic
-    expiry is NOT supported.
+    As in Redis, keys are expired lazily when
+    they are accessed. do_expire() removes every
+    key whose timeout has passed and tick() runs
+    a bounded active expire cycle.
     """
 
+    # Timeouts looked at between checks of an active expire cycle's time limit
+    ACTIVE_EXPIRE_CYCLE_LOOKUPS_PER_LOOP = 20
+    # Wall clock seconds a single active expire cycle may run for
+    ACTIVE_EXPIRE_CYCLE_TIME_LIMIT = 0.025
+    # In-progress SSCAN/HSCAN/ZSCAN iterations whose snapshots are kept; the
+    # least recently used is dropped beyond this
+    SCAN_SNAPSHOTS = 64
+    # Low bits of an SSCAN/HSCAN/ZSCAN cursor holding the offset into the
+    # snapshot; the bits above identify the iteration
+    SCAN_OFFSET_BITS = 32
+    # Messages queued per PubSub object before the oldest are dropped
+    PUBSUB_MAX_MESSAGES = 1024
+
     def __init__(self,
                  strict=False,
                  clock=None,
                  load_lua_dependencies=True,
                  blocking_timeout=1000,
                  blocking_sleep_interval=0.01,
+                 active_expire_interval=None,
+                 prefix_index=False,
                  **kwargs):
         """
         Initialize as either StrictRedis or Redis.
 
         Defaults to non-strict.
+
+        If ``active_expire_interval`` is given, an active expire cycle (see
+        ``tick``) runs as timeouts are set, at most once per that many seconds
+        of ``clock`` time.
+
+        Blocking pops wait to be woken by a push rather than polling, so
+        ``blocking_sleep_interval`` is accepted only for compatibility.
+
+        If ``prefix_index`` is set, keys are also kept sorted so that KEYS and
+        scan_iter with a pattern that starts with literal text only visit the
+        keys starting with that text, at some cost to creating and deleting keys.
         """
         self.strict = strict
         self.clock = SystemClock() if clock is None else clock
         self.load_lua_dependencies = load_lua_dependencies
         self.blocking_timeout = blocking_timeout
         self.blocking_sleep_interval = blocking_sleep_interval
+        self.active_expire_interval = active_expire_interval
+        self._last_active_expire = None
         # The 'Redis' store
-        self.redis = defaultdict(dict)
+        self.redis = KeySpace(dict, prefix_index=prefix_index)
         self.redis_config = defaultdict(dict)
         self.timeouts = defaultdict(dict)
-        # The 'PubSub' store
-        self.pubsub = defaultdict(list)
+        # Min-heap of (expiry time, key); entries made stale by a later
+        # expire/persist/delete are skipped when popped
+        self._expiry_heap = []
+        # Guards list pushes and pops against the blocking pops waiting on them
+        self._lock = threading.RLock()
+        # Dictionary from list key to the conditions of blocked pops, oldest first
+        self._list_waiters = dict()
+        # Dictionary from (key, iteration id) to the member snapshot of an
+        # in-progress SSCAN/HSCAN/ZSCAN, least recently used first
+        self._scan_snapshots = OrderedDict()
+        self._last_scan_id = 0
+        # Dictionary from scanned key to the collection its snapshots were taken
+        # of and the ids of their iterations, so that they can be dropped with it
+        self._scan_keys = dict()
+        # Dictionaries from watched key to the number of pipelines watching
+        # it and to its version, which every modification of the key bumps
+        self._watch_counts = dict()
+        self._watch_versions = dict()
+        # Dictionary from channel to the tuple of PubSub objects subscribed to it,
+        # replaced rather than changed so that publish needn't lock
+        self._subscribers = dict()
         # Dictionary from script to sha ''Script''
         self.shas = dict()
+        # Dictionary from sha to the Script that EVALSHA runs for it
+        self._scripts = dict()
+        # The Lua runtime of scripts run against this client, made on first use
+        self._lua = None
 
     @classmethod
     def from_url(cls, url, db=None, **kwargs):
@@ -135,38 +193,34 @@ class MockRedis(object):
     # Keys Functions #
 
     def type(self, key):
-        key = self._encode(key)
-        if key not in self.redis:
+        return self._type(self._encode(key))
+
+    def _type(self, key):
+        """
+        Return the type of the value at (encoded) ``key``.
+        """
+        self._expire_if_needed(key)
+        value = self.redis.get(key)
+        if value is None:
             return b'none'
-        type_ = type(self.redis[key])
-        if type_ is dict:
-            return b'hash'
-        elif type_ is str:
-            return b'string'
-        elif type_ is set:
-            return b'set'
-        elif type_ is list:
-            return b'list'
-        elif type_ is SortedSet:
-            return b'zset'
-        raise TypeError("unhandled type {}".format(type_))
+        try:
+            return _TYPE_NAMES[type(value)]
+        except KeyError:
+            raise TypeError("unhandled type {}".format(type(value)))
 
     def keys(self, pattern='*'):
         """Emulate keys."""
-        # making sure the pattern is unicode/str.
-        try:
-            pattern = pattern.decode('utf-8')
-            # This throws an AttributeError in python 3, or an
-            # UnicodeEncodeError in python 2
-        except (AttributeError, UnicodeEncodeError):
-            pass
-
-        # Make regex out of glob styled pattern.
-        regex = fnmatch.translate(pattern)
-        regex = re.compile(re.sub(r'(^|[^\\])\.', r'\1[^/]', regex))
+        pattern = self._encode(pattern)
+        matcher = compile_pattern(pattern)
+        prefix = literal_prefix(pattern)
+        if prefix and self.redis.prefix_indexed:
+            candidates = self.redis.with_prefix(prefix)
+        else:
+            candidates = self.redis
 
         # Find every key that matches the pattern
-        return [key for key in self.redis.keys() if regex.match(key.decode('utf-8'))]
+        matches = [key for key in candidates if matcher(key)]
+        return [key for key in matches if not self._expire_if_needed(key)]
 
     def delete(self, *keys):
         """Emulate delete."""
@@ -175,8 +229,8 @@ class MockRedis(object):
             if key in self.redis:
                 del self.redis[key]
                 key_counter += 1
-            if key in self.timeouts:
-                del self.timeouts[key]
+                self._signal_modified(key)
+            self._clear_timeout(key)
         return key_counter
 
     def __delitem__(self, name):
@@ -186,31 +240,92 @@ class MockRedis(object):
 
     def exists(self, key):
         """Emulate exists."""
-        return self._encode(key) in self.redis
+        key = self._encode(key)
+        self._expire_if_needed(key)
+        return key in self.redis
     __contains__ = exists
 
-    def _expire(self, key, delta):
+    def _expire(self, key, milliseconds):
+        self._expire_if_needed(key)
         if key not in self.redis:
             return False
 
-        self.timeouts[key] = self.clock.now() + delta
+        self._set_timeout(key, self.clock.now_ms() + milliseconds)
         return True
 
+    def _set_timeout(self, key, when):
+        """
+        Record that ``key`` expires at ``when`` (milliseconds since the epoch).
+        """
+        self.timeouts[key] = when
+        heappush(self._expiry_heap, (when, key))
+        self._signal_modified(key)
+        if len(self._expiry_heap) > 2 * len(self.timeouts) + 64:
+            # too many stale entries; rebuild from the live timeouts
+            self._expiry_heap = [(value, key) for key, value in self.timeouts.items()]
+            heapify(self._expiry_heap)
+        if self.active_expire_interval is not None:
+            self._maybe_active_expire()
+
+    def _maybe_active_expire(self):
+        """
+        Run an active expire cycle if one is due.
+        """
+        now = self.clock.now_ms()
+        last = self._last_active_expire
+        if last is None or now - last >= self.active_expire_interval * 1000:
+            self._last_active_expire = now
+            self.tick()
+
+    def _clear_timeout(self, key):
+        """
+        Make ``key`` persistent. Its heap entry is left behind as stale.
+        """
+        return self.timeouts.pop(key, None) is not None
+
+    def _expire_if_needed(self, key):
+        """
+        Remove ``key`` if its timeout has passed, as Redis does when a key is accessed.
+
+        Returns whether the key was expired.
+        """
+        when = self.timeouts.get(key)
+        if when is not None and when < self.clock.now_ms():
+            self._remove_expired(key)
+            return True
+        return False
+
+    def _remove_expired(self, key):
+        """
+        Remove an expired key and its timeout.
+        """
+        del self.timeouts[key]
+        self.redis.pop(key, None)
+        self._signal_modified(key)
+
     def expire(self, key, delta):
         """Emulate expire"""
-        delta = delta if isinstance(delta, timedelta) else timedelta(seconds=delta)
-        return self._expire(self._encode(key), delta)
+        return self._expire(self._encode(key), to_milliseconds(delta, 1000))
 
     def pexpire(self, key, milliseconds):
         """Emulate pexpire"""
-        return self._expire(self._encode(key), timedelta(milliseconds=milliseconds))
+        return self._expire(self._encode(key), to_milliseconds(milliseconds))
 
     def expireat(self, key, when):
         """Emulate expireat"""
-        expire_time = datetime.fromtimestamp(when)
+        expire_time = int(when * 1000)
         key = self._encode(key)
+        self._expire_if_needed(key)
         if key in self.redis:
-            self.timeouts[key] = expire_time
+            self._set_timeout(key, expire_time)
+            return True
+        return False
+
+    def persist(self, key):
+        """Emulate persist"""
+        key = self._encode(key)
+        if self.exists(key) and self._clear_timeout(key):
+            self._signal_modified(key)
             return True
         return False
 
@@ -244,6 +359,7 @@ class MockRedis(object):
         Returns time to live in milliseconds if output_ms is True, else returns seconds.
         """
         key = self._encode(key)
+        self._expire_if_needed(key)
         if key not in self.redis:
             # as of redis 2.8, -2 is returned if the key does not exist
             return long(-2) if self.strict else None
@@ -252,26 +368,58 @@ class MockRedis(object):
             # redis-py returns None; command docs say -1
             return long(-1) if self.strict else None
 
-        time_to_live = get_total_milliseconds(self.timeouts[key] - self.clock.now())
+        time_to_live = self.timeouts[key] - self.clock.now_ms()
         return long(max(-1, time_to_live))
 
     def do_expire(self):
         """
         Expire objects assuming now == time
-        """
-        # Deep copy to avoid RuntimeError: dictionary changed size during iteration
-        _timeouts = deepcopy(self.timeouts)
-        for key, value in _timeouts.items():
-            if value - self.clock.now() < timedelta(0):
-                del self.timeouts[key]
-                # removing the expired key
-                if key in self.redis:
-                    self.redis.pop(key, None)
+
+        Only keys whose timeout has passed are visited.
+        """
+        now = self.clock.now_ms()
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            when, key = heappop(heap)
+            if self.timeouts.get(key) == when:
+                self._remove_expired(key)
+
+    def tick(self):
+        """
+        Run one active expire cycle, reclaiming keys whose timeout has passed even
+        if they are never accessed again.
+
+        Like Redis' activeExpireCycle, the cycle stops after a small time limit,
+        checked every 20 timeouts. Rather than sampling keys at random and
+        guessing from them how many more have expired, it takes the timeouts that
+        have passed from the expiry heap, soonest first, until none are left;
+        stale entries left by a later EXPIRE or PERSIST are skipped. Returns the
+        number of keys expired.
+        """
+        lookups_per_loop = self.ACTIVE_EXPIRE_CYCLE_LOOKUPS_PER_LOOP
+        deadline = time.time() + self.ACTIVE_EXPIRE_CYCLE_TIME_LIMIT
+        now = self.clock.now_ms()
+        heap = self._expiry_heap
+        total = 0
+        while True:
+            for _ in range(lookups_per_loop):
+                if not heap or heap[0][0] >= now:
+                    return total
+                when, key = heappop(heap)
+                if self.timeouts.get(key) == when:
+                    self._remove_expired(key)
+                    total += 1
+            if time.time() > deadline:
+                return total
 
     def flushdb(self):
         self.redis.clear()
-        self.pubsub.clear()
         self.timeouts.clear()
+        del self._expiry_heap[:]
+        self._scan_snapshots.clear()
+        self._scan_keys.clear()
+        for key in self._watch_versions:
+            self._watch_versions[key] += 1
 
     def rename(self, old_key, new_key):
         return self._rename(old_key, new_key)
@@ -282,8 +430,18 @@ class MockRedis(object):
     def _rename(self, old_key, new_key, nx=False):
         old_key = self._encode(old_key)
         new_key = self._encode(new_key)
+        self._expire_if_needed(old_key)
+        self._expire_if_needed(new_key)
         if old_key in self.redis and (not nx or new_key not in self.redis):
             self.redis[new_key] = self.redis.pop(old_key)
+            self._signal_modified(old_key)
+            self._signal_modified(new_key)
+            # the timeout, if any, moves with the value
+            when = self.timeouts.get(old_key)
+            self._clear_timeout(old_key)
+            self._clear_timeout(new_key)
+            if when is not None:
+                self._set_timeout(new_key, when)
             return True
         return False
 
@@ -294,7 +452,15 @@ class MockRedis(object):
 
     def get(self, key):
         key = self._encode(key)
-        return self.redis.get(key)
+        self._expire_if_needed(key)
+        value = self.redis.get(key)
+        if isinstance(value, _INTEGER_TYPES):
+            # a counter
+            return self._encode(value)
+        if type(value) is bytearray:
+            # a bitmap
+            return bytes(value)
+        return value
 
     def __getitem__(self, name):
         """
@@ -328,11 +494,11 @@ class MockRedis(object):
         if self._should_set(key, mode):
             expire = None
             if ex is not None:
-                expire = ex if isinstance(ex, timedelta) else timedelta(seconds=ex)
+                expire = to_milliseconds(ex, 1000)
             if px is not None:
-                expire = px if isinstance(px, timedelta) else timedelta(milliseconds=px)
+                expire = to_milliseconds(px)
 
-            if expire is not None and expire.total_seconds() <= 0:
+            if expire is not None and expire <= 0:
                 raise ResponseError("invalid expire time in SETEX")
 
             result = self._set(key, value)
@@ -349,10 +515,10 @@ class MockRedis(object):
 
     def _set(self, key, value):
         self.redis[key] = self._encode(value)
+        self._signal_modified(key)
 
         # removing the timeout
-        if key in self.timeouts:
-            self.timeouts.pop(key, None)
+        self._clear_timeout(key)
 
         return True
 
@@ -367,6 +533,7 @@ class MockRedis(object):
         if mode is None or mode not in ["nx", "xx"]:
             return True
 
+        self._expire_if_needed(key)
         if mode == "nx":
             if key in self.redis:
                 # nx means set only if key is absent
@@ -438,7 +605,7 @@ class MockRedis(object):
             raise ResponseError("wrong number of arguments for 'msetnx' command")
 
         for key in mapping.keys():
-            if self._encode(key) in self.redis:
+            if self.exists(key):
                 return False
         for key, value in mapping.items():
             self.set(key, value)
@@ -447,27 +614,44 @@ class MockRedis(object):
 
     def decr(self, key, amount=1):
         key = self._encode(key)
-        previous_value = long(self.redis.get(key, '0'))
-        self.redis[key] = self._encode(previous_value - amount)
-        return long(self.redis[key])
+        value = self._get_counter(key) - amount
+        self.redis[key] = value
+        self._signal_modified(key)
+        return value
 
     decrby = decr
 
     def incr(self, key, amount=1):
         """Emulate incr."""
         key = self._encode(key)
-        previous_value = long(self.redis.get(key, '0'))
-        self.redis[key] = self._encode(previous_value + amount)
-        return long(self.redis[key])
+        value = self._get_counter(key) + amount
+        self.redis[key] = value
+        self._signal_modified(key)
+        return value
 
     incrby = incr
 
+    def _get_counter(self, key):
+        """
+        Return the integer value of the string at (encoded) ``key``, 0 if it doesn't exist.
+
+        Like Redis' int encoding, INCR and DECR store counters as integers, which
+        are only encoded as bytes when read.
+        """
+        self._expire_if_needed(key)
+        value = self.redis.get(key, 0)
+        if isinstance(value, (bytes, bytearray)):
+            value = long(bytes(value))
+        return value
+
     def setbit(self, key, offset, value):
         """
         Set the bit at ``offset`` in ``key`` to ``value``.
         """
         key = self._encode(key)
-        index, bits, mask = self._get_bits_and_offset(key, offset)
+        bits = self._get_bitmap(key, 'SETBIT', create=True)
+        index, position = divmod(offset, 8)
+        mask = 128 >> position
 
         if index >= len(bits):
             bits.extend(b"\x00" * (index + 1 - len(bits)))
@@ -478,8 +662,7 @@ class MockRedis(object):
             bits[index] |= mask
         else:
             bits[index] &= ~mask
-
-        self.redis[key] = bytes(bits)
+        self._signal_modified(key)
 
         return prev_val
 
@@ -487,19 +670,160 @@ class MockRedis(object):
         """
         Returns the bit value at ``offset`` in ``key``.
         """
-        key = self._encode(key)
-        index, bits, mask = self._get_bits_and_offset(key, offset)
+        bits = self._get_bitmap(self._encode(key), 'GETBIT')
+        index, position = divmod(offset, 8)
 
         if index >= len(bits):
             return 0
 
-        return 1 if (bits[index] & mask) else 0
+        return 1 if (bits[index] & (128 >> position)) else 0
+
+    def bitcount(self, key, start=None, end=None):
+        """
+        Returns the number of set bits in ``key``, optionally only counting
+        the bytes from ``start`` to ``end``.
+        """
+        if (start is None) ^ (end is None):
+            raise RedisError("Both start and end must be specified")
+        bits = self._get_bitmap(self._encode(key), 'BITCOUNT')
+        if start is not None:
+            start, end = self._translate_range(len(bits), start, end)
+            bits = bits[start:end + 1]
+        return popcount(bits)
+
+    def bitpos(self, key, bit, start=None, end=None):
+        """
+        Return the position of the first bit set to 1 or 0 in ``key``,
+        optionally only looking at the bytes from ``start`` to ``end``.
+        """
+        if bit not in (0, 1):
+            raise RedisError("bit must be 0 or 1")
+        if start is None and end is not None:
+            raise RedisError("start argument is not set, when end is specified")
+        bits = self._get_bitmap(self._encode(key), 'BITPOS')
+        if not bits:
+            return -1 if bit else 0
+
+        first, last = self._translate_range(
+            len(bits), 0 if start is None else start, -1 if end is None else end)
+        if first > last:
+            return -1
+        skip = b"\x00" if bit else b"\xff"
+        searched = bits[first:last + 1]
+        remaining = searched.lstrip(skip)
+        if not remaining:
+            # like Redis, clear bits are assumed past the end of the string
+            # unless the range was bounded
+            return (last + 1) * 8 if not bit and end is None else -1
+        byte = remaining[0] if bit else ~remaining[0] & 0xff
+        return (first + len(searched) - len(remaining)) * 8 + 8 - byte.bit_length()
+
+    def bitop(self, operation, dest, *keys):
+        """
+        Perform a bitwise AND, OR, XOR or NOT between ``keys`` and store the
+        result in ``dest``, returning its length.
+
+        Strings are combined as whole big integers rather than byte by byte.
+        """
+        operation = self._encode(operation).upper()
+        if operation not in _BITOPS and operation != b'NOT':
+            raise ResponseError("syntax error")
+        if not keys:
+            raise ResponseError("wrong number of arguments for 'bitop' command")
+        if operation == b'NOT' and len(keys) != 1:
+            raise ResponseError("BITOP NOT must be called with a single source key.")
+
+        sources = [self._get_bitmap(self._encode(key), 'BITOP') for key in keys]
+        length = max(len(source) for source in sources)
+        # shorter strings are padded with zero bytes
+        numbers = [bytes_to_int(source) if len(source) == length else
+                   bytes_to_int(source) << (8 * (length - len(source)))
+                   for source in sources]
+        if operation == b'NOT':
+            result = ~numbers[0] & ((1 << (8 * length)) - 1)
+        else:
+            result = reduce(_BITOPS[operation], numbers)
+
+        dest = self._encode(dest)
+        if length:
+            self._set(dest, int_to_bytes(result, length))
+        else:
+            self.delete(dest)
+        return length
 
-    def _get_bits_and_offset(self, key, offset):
-        bits = bytearray(self.redis.get(key, b""))
-        index, position = divmod(offset, 8)
-        mask = 128 >> position
-        return index, bits, mask
+    def bitfield(self, key, default_overflow=None):
+        """
+        Return a MockBitFieldOperation to build up a BITFIELD command for ``key``.
+        """
+        return MockBitFieldOperation(self, key, default_overflow=default_overflow)
+
+    def _bitfield(self, key, operations):
+        """
+        Run the GET, SET, INCRBY and OVERFLOW ``operations`` of a BITFIELD command.
+        """
+        # parse everything first so that a bad operation changes nothing
+        parsed = []
+        overflow = b'WRAP'
+        for operation in operations:
+            command = _BITFIELD_COMMANDS.get(operation[0])
+            if command is None:
+                command = self._encode(operation[0]).upper()
+            if command == b'OVERFLOW':
+                overflow = self._encode(operation[1]).upper()
+                if overflow not in (b'WRAP', b'SAT', b'FAIL'):
+                    raise ResponseError("Invalid OVERFLOW type specified")
+                continue
+            if command not in (b'GET', b'SET', b'INCRBY'):
+                raise ResponseError("syntax error")
+            field = get_field(operation[1], operation[2])
+            argument = None if command == b'GET' else int(operation[3])
+            parsed.append((command, field, argument, overflow))
+
+        # like Redis, grow the string to cover every write first, even ones that FAIL
+        length = max([(field.offset + field.width + 7) // 8
+                      for command, field, _, _ in parsed if command != b'GET'] or [0])
+        key = self._encode(key)
+        bits = self._get_bitmap(key, 'BITFIELD', create=bool(length))
+        if length:
+            if length > len(bits):
+                bits.extend(b"\x00" * (length - len(bits)))
+            self._signal_modified(key)
+        results = []
+        for command, field, argument, overflow in parsed:
+            value = field.get(bits)
+            if command == b'GET':
+                results.append(value)
+                continue
+            if command == b'SET':
+                new_value = field.overflow(argument, overflow)
+            else:
+                value = new_value = field.overflow(value + argument, overflow)
+            if new_value is not None:
+                field.set(bits, new_value)
+            results.append(value if new_value is not None else None)
+        return results
+
+    def _get_bitmap(self, key, operation, create=False):
+        """
+        Get (and maybe create) the string at (encoded) ``key`` as a bytearray.
+
+        The string is converted in place, so bit commands modify it directly
+        rather than copying it.
+        """
+        self._expire_if_needed(key)
+        value = self.redis.get(key)
+        if type(value) is bytearray:
+            return value
+        if value is None:
+            value = bytearray()
+            if not create:
+                return value
+        elif _TYPE_NAMES.get(type(value)) == b'string':
+            value = bytearray(self._encode(value))
+        else:
+            raise TypeError("{} requires a {}".format(operation, b'string'))
+        self.redis[key] = value
+        return value
 
     # Hash Functions #
 
@@ -533,6 +857,8 @@ class MockRedis(object):
                 del redis_hash[attribute]
                 if not redis_hash:
                     self.delete(hashkey)
+        if count:
+            self._signal_modified(hashkey)
         return count
 
     def hlen(self, hashkey):
@@ -547,6 +873,7 @@ class MockRedis(object):
         for key, value in value.items():
             attribute = self._encode(key)
             redis_hash[attribute] = self._encode(value)
+        self._signal_modified(hashkey)
         return True
 
     def hmget(self, hashkey, keys, *args):
@@ -563,6 +890,7 @@ class MockRedis(object):
         attribute = self._encode(attribute)
         attribute_present = attribute in redis_hash
         redis_hash[attribute] = self._encode(value)
+        self._signal_modified(hashkey)
         return long(0) if attribute_present else long(1)
 
     def hsetnx(self, hashkey, attribute, value):
@@ -574,6 +902,7 @@ class MockRedis(object):
             return long(0)
         else:
             redis_hash[attribute] = self._encode(value)
+            self._signal_modified(hashkey)
             return long(1)
 
     def hincrby(self, hashkey, attribute, increment=1):
@@ -590,9 +919,10 @@ class MockRedis(object):
         """Shared hincrby and hincrbyfloat routine"""
         redis_hash = self._get_hash(hashkey, command, create=True)
         attribute = self._encode(attribute)
-        previous_value = type_(redis_hash.get(attribute, '0'))
-        redis_hash[attribute] = self._encode(previous_value + increment)
-        return type_(redis_hash[attribute])
+        value = type_(redis_hash.get(attribute, '0')) + increment
+        redis_hash[attribute] = self._encode(value)
+        self._signal_modified(hashkey)
+        return value
 
     def hkeys(self, hashkey):
         """Emulate hkeys."""
@@ -612,14 +942,14 @@ class MockRedis(object):
         """Emulate lrange."""
         redis_list = self._get_list(key, 'LRANGE')
         start, stop = self._translate_range(len(redis_list), start, stop)
-        return redis_list[start:stop + 1]
+        return redis_list.range(start, stop + 1)
 
     def lindex(self, key, index):
         """Emulate lindex."""
-
+        key = self._encode(key)
         redis_list = self._get_list(key, 'LINDEX')
 
-        if self._encode(key) not in self.redis:
+        if key not in self.redis:
             return None
 
         try:
@@ -648,22 +978,51 @@ class MockRedis(object):
         else:
             keys = list(keys)
 
-        elapsed_time = 0
-        start = time.time()
-        while elapsed_time < timeout:
+        with self._lock:
             key, val = self._pop_first_available(pop_func, keys)
             if val:
                 return key, val
-            # small delay to avoid high cpu utilization
-            time.sleep(self.blocking_sleep_interval)
-            elapsed_time = time.time() - start
-        return None
+
+            # queue up behind any clients already blocked on these keys
+            waiter = threading.Condition(self._lock)
+            encoded_keys = [self._encode(key) for key in keys]
+            for key in encoded_keys:
+                self._list_waiters.setdefault(key, deque()).append(waiter)
+            try:
+                deadline = time.time() + timeout
+                while True:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    waiter.wait(remaining)
+                    key, val = self._pop_first_available(pop_func, keys)
+                    if val:
+                        return key, val
+            finally:
+                for key in encoded_keys:
+                    waiters = self._list_waiters[key]
+                    waiters.remove(waiter)
+                    if waiters:
+                        # hand anything left over to the next client in line
+                        self._wake_list_waiter(key)
+                    else:
+                        del self._list_waiters[key]
+
+    def _wake_list_waiter(self, key):
+        """
+        Wake the client that has been blocked on the (encoded) list key the
+        longest, if there is one and the list has items for it.
+        """
+        waiters = self._list_waiters.get(key)
+        if waiters and key in self.redis:
+            waiters[0].notify()
 
     def _pop_first_available(self, pop_func, keys):
         for key in keys:
+            key = self._encode(key)
             val = pop_func(key)
             if val:
-                return self._encode(key), val
+                return key, val
         return None, None
 
     def blpop(self, keys, timeout=0):
@@ -676,90 +1035,94 @@ class MockRedis(object):
 
     def lpop(self, key):
         """Emulate lpop."""
-        redis_list = self._get_list(key, 'LPOP')
-
-        if self._encode(key) not in self.redis:
-            return None
-
-        try:
-            value = redis_list.pop(0)
-            if len(redis_list) == 0:
-                self.delete(key)
-            return value
-        except (IndexError):
-            # Redis returns nil if popping from an empty list
-            return None
+        key = self._encode(key)
+        with self._lock:
+            redis_list = self._get_list(key, 'LPOP')
+
+            if key not in self.redis:
+                return None
+
+            try:
+                value = redis_list.popleft()
+                self._signal_modified(key)
+                if len(redis_list) == 0:
+                    self.delete(key)
+                return value
+            except (IndexError):
+                # Redis returns nil if popping from an empty list
+                return None
 
     def lpush(self, key, *args):
         """Emulate lpush."""
-        redis_list = self._get_list(key, 'LPUSH', create=True)
+        key = self._encode(key)
+        with self._lock:
+            redis_list = self._get_list(key, 'LPUSH', create=True)
 
-        # Creates the list at this key if it doesn't exist, and appends args to its beginning
-        args_reversed = [self._encode(arg) for arg in args]
-        args_reversed.reverse()
-        updated_list = args_reversed + redis_list
-        self.redis[self._encode(key)] = updated_list
+            # Creates the list at this key if it doesn't exist, and prepends args one by one
+            redis_list.extendleft(map(self._encode, args))
+            self._signal_modified(key)
+            self._wake_list_waiter(key)
 
-        # Return the length of the list after the push operation
-        return len(updated_list)
+            # Return the length of the list after the push operation
+            return len(redis_list)
 
     def rpop(self, key):
         """Emulate lpop."""
-        redis_list = self._get_list(key, 'RPOP')
-
-        if self._encode(key) not in self.redis:
-            return None
-
-        try:
-            value = redis_list.pop()
-            if len(redis_list) == 0:
-                self.delete(key)
-            return value
-        except (IndexError):
-            # Redis returns nil if popping from an empty list
-            return None
+        key = self._encode(key)
+        with self._lock:
+            redis_list = self._get_list(key, 'RPOP')
+
+            if key not in self.redis:
+                return None
+
+            try:
+                value = redis_list.pop()
+                self._signal_modified(key)
+                if len(redis_list) == 0:
+                    self.delete(key)
+                return value
+            except (IndexError):
+                # Redis returns nil if popping from an empty list
+                return None
 
     def rpush(self, key, *args):
         """Emulate rpush."""
-        redis_list = self._get_list(key, 'RPUSH', create=True)
+        key = self._encode(key)
+        with self._lock:
+            redis_list = self._get_list(key, 'RPUSH', create=True)
 
-        # Creates the list at this key if it doesn't exist, and appends args to it
-        redis_list.extend(map(self._encode, args))
+            # Creates the list at this key if it doesn't exist, and appends args to it
+            redis_list.extend(map(self._encode, args))
+            self._signal_modified(key)
+            self._wake_list_waiter(key)
 
-        # Return the length of the list after the push operation
-        return len(redis_list)
+            # Return the length of the list after the push operation
+            return len(redis_list)
 
     def lrem(self, key, value, count=0):
         """Emulate lrem."""
+        key = self._encode(key)
         value = self._encode(value)
         redis_list = self._get_list(key, 'LREM')
         removed_count = 0
-        if self._encode(key) in self.redis:
-            if count == 0:
-                # Remove all ocurrences
-                while redis_list.count(value):
-                    redis_list.remove(value)
-                    removed_count += 1
-            elif count > 0:
-                counter = 0
-                # remove first 'count' ocurrences
-                while redis_list.count(value):
-                    redis_list.remove(value)
-                    counter += 1
+        if key in self.redis:
+            # remove the first 'count' ocurrences, the last '-count' ocurrences
+            # or, if count is 0, all of them, in a single pass
+            counter = abs(count) or len(redis_list)
+            kept = []
+            for v in (reversed(redis_list) if count < 0 else redis_list):
+                if counter > 0 and v == value:
+                    counter -= 1
                     removed_count += 1
-                    if counter >= count:
-                        break
-            elif count < 0:
-                # remove last 'count' ocurrences
-                counter = -count
-                new_list = []
-                for v in reversed(redis_list):
-                    if v == value and counter > 0:
-                        counter -= 1
-                        removed_count += 1
-                    else:
-                        new_list.append(v)
-                redis_list[:] = list(reversed(new_list))
+                else:
+                    kept.append(v)
+            if removed_count:
+                redis_list.clear()
+                if count < 0:
+                    redis_list.extendleft(kept)
+                else:
+                    redis_list.extend(kept)
+                self._signal_modified(key)
         if removed_count > 0 and len(redis_list) == 0:
             self.delete(key)
         return removed_count
@@ -769,25 +1132,30 @@ class MockRedis(object):
         redis_list = self._get_list(key, 'LTRIM')
         if redis_list:
             start, stop = self._translate_range(len(redis_list), start, stop)
-            self.redis[self._encode(key)] = redis_list[start:stop + 1]
+            redis_list.trim(start, stop + 1)
+            self._signal_modified(key)
+            if not redis_list:
+                self.delete(key)
         return True
 
     def rpoplpush(self, source, destination):
         """Emulate rpoplpush"""
-        transfer_item = self.rpop(source)
-        if transfer_item is not None:
-            self.lpush(destination, transfer_item)
-        return transfer_item
+        with self._lock:
+            transfer_item = self.rpop(source)
+            if transfer_item is not None:
+                self.lpush(destination, transfer_item)
+            return transfer_item
 
     def brpoplpush(self, source, destination, timeout=0):
         """Emulate brpoplpush"""
-        transfer_item = self.brpop(source, timeout)
-        if transfer_item is None:
-            return None
+        with self._lock:
+            transfer_item = self.brpop(source, timeout)
+            if transfer_item is None:
+                return None
 
-        key, val = transfer_item
-        self.lpush(destination, val)
-        return val
+            key, val = transfer_item
+            self.lpush(destination, val)
+            return val
 
     def lset(self, key, index, value):
         """Emulate lset."""
@@ -798,6 +1166,7 @@ class MockRedis(object):
             redis_list[index] = self._encode(value)
         except IndexError:
             raise ResponseError("index out of range")
+        self._signal_modified(key)
 
     def sort(self, name,
              start=None,
@@ -872,17 +1241,88 @@ class MockRedis(object):
 
         # either store value and return length of results or just return results
         if store:
-            self.redis[self._encode(store)] = results
+            store = self._encode(store)
+            with self._lock:
+                self.redis[store] = QuickList(results)
+                self._signal_modified(store)
+                self._wake_list_waiter(store)
             return len(results)
         else:
             return results
 
     # SCAN COMMANDS #
 
-    def _common_scan(self, values_function, cursor='0', match=None, count=10, key=None):
+    def _snapshot_page(self, name, members_function, values_function):
+        """
+        Make a page function that walks a snapshot of a collection's members.
+
+        ``members_function`` lists the members in a consistent order when an
+        iteration starts. Each iteration is given an id, which goes in the high
+        bits of its cursors with the offset into the snapshot in the low bits,
+        so concurrent scans of one key keep separate snapshots and each further
+        page costs O(count). ``values_function`` turns a page of members into
+        values, dropping any removed since the snapshot.
+
+        The first page still lists every member, which for sets and hashes
+        means an O(N log N) sort.
+
+        Only the ``SCAN_SNAPSHOTS`` most recently used snapshots are kept, and a
+        key's snapshots are dropped when it is deleted, renamed or replaced. An
+        iteration whose snapshot was dropped carries on from the same offset
+        into a fresh snapshot, so like a Redis scan of a changing collection it
+        may then return members twice or miss ones removed or added meanwhile.
+        """
+        offset_bits = self.SCAN_OFFSET_BITS
+
+        def page_function(cursor, count):
+            key = self._encode(name)
+            scan_id = cursor >> offset_bits
+            offset = cursor & ((1 << offset_bits) - 1)
+            members = self._scan_snapshots.pop((key, scan_id), None) if scan_id else None
+            if members is None:
+                members = members_function()
+                self._last_scan_id += 1
+                scan_id = self._last_scan_id
+            else:
+                self._forget_scan_snapshot(key, scan_id)
+            page = values_function(members[offset:offset + count])
+            if offset + count >= len(members):
+                # we reached the end, back to zero
+                return [0, page]
+            self._scan_snapshots[(key, scan_id)] = members
+            if key not in self._scan_keys:
+                self._scan_keys[key] = (self.redis.get(key), set())
+            self._scan_keys[key][1].add(scan_id)
+            if len(self._scan_snapshots) > self.SCAN_SNAPSHOTS:
+                self._forget_scan_snapshot(*self._scan_snapshots.popitem(last=False)[0])
+            return [(scan_id << offset_bits) | (offset + count), page]
+        return page_function
+
+    def _forget_scan_snapshot(self, key, scan_id):
+        """
+        Remove a snapshot, which has left ``_scan_snapshots``, from ``_scan_keys``.
+        """
+        scan_ids = self._scan_keys[key][1]
+        scan_ids.discard(scan_id)
+        if not scan_ids:
+            del self._scan_keys[key]
+
+    def _drop_replaced_scan_snapshots(self, key):
+        """
+        Drop the snapshots of ``key`` if it no longer holds the collection they were taken of.
+        """
+        collection, scan_ids = self._scan_keys[key]
+        if self.redis.get(key) is not collection:
+            del self._scan_keys[key]
+            for scan_id in scan_ids:
+                del self._scan_snapshots[(key, scan_id)]
+
+    def _common_scan(self, page_function, cursor='0', match=None, count=10, key=None):
         """
         Common scanning skeleton.
 
+        :param page_function: function of cursor and count returning the next
+            cursor and the page of values
         :param key: optional function used to identify what 'match' is applied to
         """
         if count is None:
@@ -892,31 +1332,36 @@ class MockRedis(object):
         if not count:
             raise ValueError('if specified, count must be > 0: %s' % count)
 
-        values = values_function()
-        if cursor + count >= len(values):
-            # we reached the end, back to zero
-            result_cursor = 0
-        else:
-            result_cursor = cursor + count
-
-        values = values[cursor:cursor+count]
+        result_cursor, values = page_function(cursor, count)
 
         if match is not None:
-            regex = re.compile(b'^' + re.escape(self._encode(match)).replace(b'\\*', b'.*') + b'$')
+            matcher = compile_pattern(self._encode(match))
             if not key:
                 key = lambda v: v
-            values = [v for v in values if regex.match(key(v))]
+            values = [v for v in values if matcher(key(v))]
 
         return [result_cursor, values]
 
     def scan(self, cursor='0', match=None, count=10):
         """Emulate scan."""
-        def value_function():
-            return sorted(self.redis.keys())  # sorted list for consistent order
-        return self._common_scan(value_function, cursor=cursor, match=match, count=count)
+        cursor, keys = self._common_scan(self.redis.scan, cursor=cursor, match=match, count=count)
+        return [cursor, [key for key in keys if not self._expire_if_needed(key)]]
 
     def scan_iter(self, match=None, count=10):
         """Emulate scan_iter."""
+        if match is not None and self.redis.prefix_indexed:
+            match = self._encode(match)
+            prefix = literal_prefix(match)
+            if prefix:
+                # walk the keys with the prefix in order, resuming after the last one
+                matcher = compile_pattern(match)
+                keys = self.redis.with_prefix(prefix, count=count)
+                while keys:
+                    for key in keys:
+                        if matcher(key) and not self._expire_if_needed(key):
+                            yield key
+                    keys = self.redis.with_prefix(prefix, after=keys[-1], count=count)
+                return
         cursor = '0'
         while cursor != 0:
             cursor, data = self.scan(cursor=cursor, match=match, count=count)
@@ -925,11 +1370,14 @@ class MockRedis(object):
 
     def sscan(self, name, cursor='0', match=None, count=10):
         """Emulate sscan."""
-        def value_function():
-            members = list(self.smembers(name))
-            members.sort()  # sort for consistent order
-            return members
-        return self._common_scan(value_function, cursor=cursor, match=match, count=count)
+        def members_function():
+            return sorted(self._get_set(name, 'SSCAN'))  # sort for consistent order
+
+        def values_function(members):
+            redis_set = self._get_set(name, 'SSCAN')
+            return [member for member in members if member in redis_set]
+        page_function = self._snapshot_page(name, members_function, values_function)
+        return self._common_scan(page_function, cursor=cursor, match=match, count=count)
 
     def sscan_iter(self, name, match=None, count=10):
         """Emulate sscan_iter."""
@@ -942,11 +1390,16 @@ class MockRedis(object):
 
     def zscan(self, name, cursor='0', match=None, count=10):
         """Emulate zscan."""
-        def value_function():
-            values = self.zrange(name, 0, -1, withscores=True)
-            values.sort(key=lambda x: x[1])  # sort for consistent order
-            return values
-        return self._common_scan(value_function, cursor=cursor, match=match, count=count, key=lambda v: v[0])  # noqa
+        def members_function():
+            zset = self._get_zset(name, 'ZSCAN') or ()
+            return [member for _, member in zset]  # in score order
+
+        def values_function(members):
+            zset = self._get_zset(name, 'ZSCAN') or {}
+            func = self._range_func(True, float)
+            return [func((zset[member], member)) for member in members if member in zset]
+        page_function = self._snapshot_page(name, members_function, values_function)
+        return self._common_scan(page_function, cursor=cursor, match=match, count=count, key=lambda v: v[0])  # noqa
 
     def zscan_iter(self, name, match=None, count=10):
         """Emulate zscan_iter."""
@@ -959,12 +1412,15 @@ class MockRedis(object):
 
     def hscan(self, name, cursor='0', match=None, count=10):
         """Emulate hscan."""
-        def value_function():
-            values = self.hgetall(name)
-            values = list(values.items())  # list of tuples for sorting and matching
-            values.sort(key=lambda x: x[0])  # sort for consistent order
-            return values
-        scanned = self._common_scan(value_function, cursor=cursor, match=match, count=count, key=lambda v: v[0])  # noqa
+        def members_function():
+            return sorted(self._get_hash(name, 'HSCAN'))  # sort for consistent order
+
+        def values_function(fields):
+            # list of tuples for matching
+            redis_hash = self._get_hash(name, 'HSCAN')
+            return [(field, redis_hash[field]) for field in fields if field in redis_hash]
+        page_function = self._snapshot_page(name, members_function, values_function)
+        scanned = self._common_scan(page_function, cursor=cursor, match=match, count=count, key=lambda v: v[0])  # noqa
         scanned[1] = dict(scanned[1])  # from list of tuples back to dict
         return scanned
 
@@ -987,6 +1443,8 @@ class MockRedis(object):
         before_count = len(redis_set)
         redis_set.update(map(self._encode, values))
         after_count = len(redis_set)
+        if after_count != before_count:
+            self._signal_modified(key)
         return after_count - before_count
 
     def scard(self, key):
@@ -1003,6 +1461,7 @@ class MockRedis(object):
         """Emulate sdiffstore."""
         result = self.sdiff(keys, *args)
         self.redis[self._encode(dest)] = result
+        self._signal_modified(dest)
         return len(result)
 
     def sinter(self, keys, *args):
@@ -1014,6 +1473,7 @@ class MockRedis(object):
         """Emulate sinterstore."""
         result = self.sinter(keys, *args)
         self.redis[self._encode(dest)] = result
+        self._signal_modified(dest)
         return len(result)
 
     def sismember(self, name, value):
@@ -1041,6 +1501,8 @@ class MockRedis(object):
         src_set.discard(value)
         dst_set.add(value)
         self.redis[self._encode(src)], self.redis[self._encode(dst)] = src_set, dst_set
+        self._signal_modified(src)
+        self._signal_modified(dst)
         return True
 
     def spop(self, name):
@@ -1050,6 +1512,7 @@ class MockRedis(object):
             return None
         member = choice(list(redis_set))
         redis_set.remove(member)
+        self._signal_modified(name)
         if len(redis_set) == 0:
             self.delete(name)
         return member
@@ -1075,6 +1538,8 @@ class MockRedis(object):
         for value in values:
             redis_set.discard(self._encode(value))
         after_count = len(redis_set)
+        if after_count != before_count:
+            self._signal_modified(key)
         if before_count > 0 and len(redis_set) == 0:
             self.delete(key)
         return before_count - after_count
@@ -1088,6 +1553,7 @@ class MockRedis(object):
         """Emulate sunionstore."""
         result = self.sunion(keys, *args)
         self.redis[self._encode(dest)] = result
+        self._signal_modified(dest)
         return len(result)
 
     # SORTED SET COMMANDS #
@@ -1111,8 +1577,18 @@ class MockRedis(object):
         # kwargs
         pieces.extend(kwargs.items())
 
-        insert_count = lambda member, score: 1 if zset.insert(self._encode(member), float(score)) else 0  # noqa
-        return sum((insert_count(member, score) for member, score in pieces))
+        inserted = 0
+        changed = False
+        for member, score in pieces:
+            member = self._encode(member)
+            score = float(score)
+            if zset.score(member) != score:
+                # like Redis, only a new member or a new score modifies the key
+                inserted += 1 if zset.insert(member, score) else 0
+                changed = True
+        if changed:
+            self._signal_modified(name)
+        return inserted
 
     def zcard(self, name):
         zset = self._get_zset(name, "ZCARD")
@@ -1134,6 +1610,7 @@ class MockRedis(object):
         score = zset.score(value) or 0.0
         score += float(amount)
         zset[value] = score
+        self._signal_modified(name)
         return score
 
     def zinterstore(self, dest, keys, aggregate=None):
@@ -1157,6 +1634,7 @@ class MockRedis(object):
 
         # always override existing keys
         self.redis[self._encode(dest)] = intersection
+        self._signal_modified(dest)
         return len(intersection)
 
     def zrange(self, name, start, end, desc=False, withscores=False,
@@ -1203,8 +1681,10 @@ class MockRedis(object):
 
         count_removals = lambda value: 1 if zset.remove(self._encode(value)) else 0
         removal_count = sum((count_removals(value) for value in values))
-        if removal_count > 0 and len(zset) == 0:
-            self.delete(name)
+        if removal_count > 0:
+            self._signal_modified(name)
+            if len(zset) == 0:
+                self.delete(name)
         return removal_count
 
     def zremrangebyrank(self, name, start, end):
@@ -1216,8 +1696,10 @@ class MockRedis(object):
         start, end = self._translate_range(len(zset), start, end)
         count_removals = lambda score, member: 1 if zset.remove(member) else 0
         removal_count = sum((count_removals(score, member) for score, member in zset.range(start, end)))  # noqa
-        if removal_count > 0 and len(zset) == 0:
-            self.delete(name)
+        if removal_count > 0:
+            self._signal_modified(name)
+            if len(zset) == 0:
+                self.delete(name)
         return removal_count
 
     def zremrangebyscore(self, name, min, max):
@@ -1234,8 +1716,10 @@ class MockRedis(object):
                              for score, member in zset.scorerange(min, max,
                                                                   start_inclusive=include_start,
                                                                   end_inclusive=include_end)))
-        if removal_count > 0 and len(zset) == 0:
-            self.delete(name)
+        if removal_count > 0:
+            self._signal_modified(name)
+            if len(zset) == 0:
+                self.delete(name)
         return removal_count
 
     def zrevrange(self, name, start, end, withscores=False,
@@ -1299,6 +1783,7 @@ class MockRedis(object):
 
         # always override existing keys
         self.redis[self._encode(dest)] = union
+        self._signal_modified(dest)
         return len(union)
 
     # Script Commands #
@@ -1310,9 +1795,12 @@ class MockRedis(object):
 
     def evalsha(self, sha, numkeys, *keys_and_args):
         """Emulates evalsha"""
-        if not self.script_exists(sha)[0]:
-            raise RedisError("Sha not registered")
-        script_callable = Script(self, self.shas[sha], self.load_lua_dependencies)
+        script_callable = self._scripts.get(sha)
+        if script_callable is None:
+            if not self.script_exists(sha)[0]:
+                raise RedisError("Sha not registered")
+            script_callable = Script(self, self.shas[sha], self.load_lua_dependencies)
+            self._scripts[sha] = script_callable
         numkeys = max(numkeys, 0)
         keys = keys_and_args[:numkeys]
         args = keys_and_args[numkeys:]
@@ -1325,6 +1813,9 @@ class MockRedis(object):
     def script_flush(self):
         """Emulate script_flush"""
         self.shas.clear()
+        self._scripts.clear()
+        if self._lua is not None:
+            self._lua.functions.clear()
 
     def script_kill(self):
         """Emulate script_kill"""
@@ -1346,69 +1837,96 @@ class MockRedis(object):
         Sends call to the function, whose name is specified by command.
 
         Used by Script invocations and normalizes calls using standard
-        Redis arguments to use the expected redis-py arguments.
-        """
-        command = self._normalize_command_name(command)
-        args = self._normalize_command_args(command, *args)
-
-        redis_function = getattr(self, command)
-        value = redis_function(*args)
-        return self._normalize_command_response(command, value)
+        Redis arguments to use the expected redis-py arguments. The method
+        and adapters for each command come from a table made once, so
+        resolving a command is a single dictionary lookup.
+        """
+        method, args_adapter, response_adapter = _command_entry(command)
+        if args_adapter is not None:
+            args = args_adapter(self, args)
+        value = getattr(self, method)(*args)
+        if response_adapter is not None:
+            value = response_adapter(value)
+        return value
 
     def _normalize_command_name(self, command):
         """
         Modifies the command string to match the redis client method name.
         """
-        command = command.lower()
-
-        if command == 'del':
-            return 'delete'
-
-        return command
+        return _command_entry(command)[0]
 
     def _normalize_command_args(self, command, *args):
         """
         Modifies the command arguments to match the
         strictness of the redis client.
         """
-        if command == 'zadd' and not self.strict and len(args) >= 3:
-            # Reorder score and name
-            zadd_args = [x for tup in zip(args[2::2], args[1::2]) for x in tup]
-            return [args[0]] + zadd_args
+        args_adapter = _command_entry(command)[1]
+        return args if args_adapter is None else args_adapter(self, args)
 
-        if command in ('zrangebyscore', 'zrevrangebyscore'):
-            # expected format is: <command> name min max start num with_scores score_cast_func
-            if len(args) <= 3:
-                # just plain min/max
-                return args
+    def _normalize_command_response(self, command, response):
+        response_adapter = _command_entry(command)[2]
+        return response if response_adapter is None else response_adapter(response)
 
-            start, num = None, None
-            withscores = False
+    def _call_bitfield_args(self, args):
+        """
+        Group BITFIELD's subcommands and their arguments into operations.
+        """
+        operations = []
+        index = 1
+        while index < len(args):
+            command = self._encode(args[index]).upper()
+            arity = _BITFIELD_ARITY.get(command)
+            if arity is None or index + arity >= len(args):
+                raise ResponseError("syntax error")
+            operations.append((command,) + tuple(args[index + 1:index + 1 + arity]))
+            index += 1 + arity
+        return (args[0], operations)
 
-            for i, arg in enumerate(args[3:], 3):
-                # keywords are case-insensitive
-                lower_arg = self._encode(arg).lower()
+    def _call_lrem_args(self, args):
+        """
+        Reorder LREM's count and value to match the lrem method.
+        """
+        if len(args) == 3:
+            return (args[0], args[2], args[1])
+        return args
 
-                # handle "limit"
-                if lower_arg == b"limit" and i + 2 < len(args):
-                    start, num = args[i + 1], args[i + 2]
+    def _call_zadd_args(self, args):
+        """
+        Reorder ZADD's scores and members when the client is not strict.
+        """
+        if not self.strict and len(args) >= 3:
+            # Reorder score and name
+            zadd_args = [x for tup in zip(args[2::2], args[1::2]) for x in tup]
+            return [args[0]] + zadd_args
+        return args
 
-                # handle "withscores"
-                if lower_arg == b"withscores":
-                    withscores = True
+    def _call_zrangebyscore_args(self, args):
+        """
+        Turn ZRANGEBYSCORE's LIMIT and WITHSCORES keywords into arguments.
+        """
+        # expected format is: <command> name min max start num with_scores score_cast_func
+        if len(args) <= 3:
+            # just plain min/max
+            return args
 
-            # do not expect to set score_cast_func
+        start, num = None, None
+        withscores = False
 
-            return args[:3] + (start, num, withscores)
+        for i, arg in enumerate(args[3:], 3):
+            # keywords are case-insensitive
+            lower_arg = self._encode(arg).lower()
 
-        return args
+            # handle "limit"
+            if lower_arg == b"limit" and i + 2 < len(args):
+                start, num = args[i + 1], args[i + 2]
 
-    def _normalize_command_response(self, command, response):
-        if command in ('zrange', 'zrevrange', 'zrangebyscore', 'zrevrangebyscore'):
-            if response and isinstance(response[0], tuple):
-                return [value for tpl in response for value in tpl]
+            # handle "withscores"
+            if lower_arg == b"withscores":
+                withscores = True
 
-        return response
+        # do not expect to set score_cast_func
+
+        return args[:3] + (start, num, withscores)
 
     # Config Set/Get commands #
 
@@ -1423,8 +1941,9 @@ class MockRedis(object):
         Get one or more configuration parameters.
         """
         result = {}
+        matcher = compile_pattern(self._encode(pattern))
         for name, value in self.redis_config.items():
-            if fnmatch.fnmatch(name, pattern):
+            if matcher(self._encode(name)):
                 try:
                     result[name] = int(value)
                 except ValueError:
@@ -1433,47 +1952,128 @@ class MockRedis(object):
 
     # PubSub commands #
 
+    def pubsub(self, **kwargs):
+        """Emulate a redis-python PubSub object."""
+        return MockRedisPubSub(self, **kwargs)
+
     def publish(self, channel, message):
-        self.pubsub[channel].append(message)
+        """
+        Queue ``message`` on every PubSub object subscribed to ``channel``,
+        returning how many there are.
+        """
+        channel = self._encode(channel)
+        subscribers = self._subscribers.get(channel, ())
+        if subscribers:
+            message = self._encode(message)
+            for subscriber in subscribers:
+                subscriber._deliver(channel, message)
+        return len(subscribers)
+
+    def _subscribe(self, channel, subscriber):
+        """
+        Add ``subscriber`` to the subscribers of the (encoded) ``channel``.
+        """
+        with self._lock:
+            self._subscribers[channel] = self._subscribers.get(channel, ()) + (subscriber,)
+
+    def _unsubscribe(self, channel, subscriber):
+        """
+        Remove ``subscriber`` from the subscribers of the (encoded) ``channel``.
+        """
+        with self._lock:
+            subscribers = tuple(other for other in self._subscribers[channel]
+                                if other is not subscriber)
+            if subscribers:
+                self._subscribers[channel] = subscribers
+            else:
+                del self._subscribers[channel]
 
     # Internal #
 
+    def _watch(self, key):
+        """
+        Start watching (encoded) ``key`` for a pipeline, returning its version.
+        """
+        self._expire_if_needed(key)
+        count = self._watch_counts.get(key, 0)
+        if not count:
+            self._watch_versions[key] = 0
+        self._watch_counts[key] = count + 1
+        return self._watch_versions[key]
+
+    def _unwatch(self, key):
+        """
+        Stop watching (encoded) ``key`` for a pipeline.
+        """
+        count = self._watch_counts.pop(key) - 1
+        if count:
+            self._watch_counts[key] = count
+        else:
+            del self._watch_versions[key]
+
+    def _watched_version(self, key):
+        """
+        Return the version of the watched (encoded) ``key``, expiring it first if needed.
+        """
+        self._expire_if_needed(key)
+        return self._watch_versions[key]
+
+    def _signal_modified(self, key):
+        """
+        Record that ``key`` was written, deleted, renamed or expired.
+
+        Versions are only kept for watched keys, and snapshots for scanned ones,
+        so this is almost free otherwise.
+        """
+        if self._watch_versions or self._scan_keys:
+            key = self._encode(key)
+            if key in self._watch_versions:
+                self._watch_versions[key] += 1
+            if key in self._scan_keys:
+                self._drop_replaced_scan_snapshots(key)
+
     def _get_list(self, key, operation, create=False):
         """
         Get (and maybe create) a list by name.
         """
-        return self._get_by_type(key, operation, create, b'list', [])
+        return self._get_by_type(key, operation, create, QuickList)
 
     def _get_set(self, key, operation, create=False):
         """
         Get (and maybe create) a set by name.
         """
-        return self._get_by_type(key, operation, create, b'set', set())
+        return self._get_by_type(key, operation, create, set)
 
     def _get_hash(self, name, operation, create=False):
         """
         Get (and maybe create) a hash by name.
         """
-        return self._get_by_type(name, operation, create, b'hash', {})
+        return self._get_by_type(name, operation, create, dict)
 
     def _get_zset(self, name, operation, create=False):
         """
         Get (and maybe create) a sorted set by name.
         """
-        return self._get_by_type(name, operation, create, b'zset', SortedSet(), return_default=False)  # noqa
+        return self._get_by_type(name, operation, create, SortedSet, return_default=False)
 
-    def _get_by_type(self, key, operation, create, type_, default, return_default=True):
+    def _get_by_type(self, key, operation, create, type_, return_default=True):
         """
-        Get (and maybe create) a redis data structure by name and type.
+        Get (and maybe create) a redis data structure by name and class.
+
+        Values are tagged by their class, so this is one lookup and one compare.
         """
         key = self._encode(key)
-        if self.type(key) in [type_, b'none']:
+        self._expire_if_needed(key)
+        value = self.redis.get(key)
+        if value is None:
             if create:
-                return self.redis.setdefault(key, default)
-            else:
-                return self.redis.get(key, default if return_default else None)
+                value = self.redis[key] = type_()
+                return value
+            return type_() if return_default else None
+        if type(value) is type_:
+            return value
 
-        raise TypeError("{} requires a {}".format(operation, type_))
+        raise TypeError("{} requires a {}".format(operation, _TYPE_NAMES[type_]))
 
     def _translate_range(self, len_, start, end):
         """
@@ -1550,6 +2150,13 @@ class MockRedis(object):
 
     def _encode(self, value):
         "Return a bytestring representation of the value. Taken from redis-py connection.py"
+        type_ = type(value)
+        if type_ is bytes:
+            return value
+        encoder = _ENCODERS.get(type_)
+        if encoder is not None:
+            return encoder(value)
+        # subclasses and other types
         if isinstance(value, bytes):
             return value
         elif isinstance(value, (int, long)):
@@ -1563,10 +2170,133 @@ class MockRedis(object):
         return value
 
 
+def _encode_number(value):
+    return str(value).encode('utf-8')
+
+
+def _encode_text(value):
+    return value.encode('utf-8', 'strict')
+
+
+# Types of the counters INCR and DECR store as strings
+_INTEGER_TYPES = (int, long)
+
+
+# Dictionary from the class of a stored value to its Redis type
+_TYPE_NAMES = {
+    bytes: b'string',
+    bytearray: b'string',
+    int: b'string',
+    long: b'string',
+    dict: b'hash',
+    set: b'set',
+    QuickList: b'list',
+    SortedSet: b'zset',
+}
+
+
+# Dictionary from the exact type of a value to the function MockRedis._encode
+# uses for it, to save walking through isinstance checks
+_ENCODERS = {
+    int: _encode_number,
+    long: _encode_number,
+    bool: _encode_number,
+    float: lambda value: repr(value).encode('utf-8'),
+    type(u''): _encode_text,
+}
+
+
+# Dictionary from the BITFIELD operation names redis-py uses to their encoded form
+_BITFIELD_COMMANDS = {
+    'GET': b'GET',
+    'SET': b'SET',
+    'INCRBY': b'INCRBY',
+    'OVERFLOW': b'OVERFLOW',
+}
+
+
+# Dictionary from BITFIELD subcommand to its number of arguments
+_BITFIELD_ARITY = {
+    b'GET': 2,
+    b'SET': 3,
+    b'INCRBY': 3,
+    b'OVERFLOW': 1,
+}
+
+
+# Dictionary from BITOP operation to how it combines two strings as integers
+_BITOPS = {
+    b'AND': and_,
+    b'OR': or_,
+    b'XOR': xor,
+}
+
+
+def _flatten_pairs(response):
+    """
+    Flatten (member, score) pairs into the flat list Redis replies with.
+    """
+    if response and isinstance(response[0], tuple):
+        return [value for tpl in response for value in tpl]
+    return response
+
+
+# Dictionary from the Redis commands whose name or arguments differ from their
+# MockRedis method to (method name, argument adapter, response adapter)
+_COMMAND_ADAPTERS = {
+    'bitfield': ('_bitfield', MockRedis._call_bitfield_args, None),
+    'del': ('delete', None, None),
+    'lrem': ('lrem', MockRedis._call_lrem_args, None),
+    'zadd': ('zadd', MockRedis._call_zadd_args, None),
+    'zrange': ('zrange', None, _flatten_pairs),
+    'zrevrange': ('zrevrange', None, _flatten_pairs),
+    'zrangebyscore': ('zrangebyscore', MockRedis._call_zrangebyscore_args, _flatten_pairs),
+    'zrevrangebyscore': ('zrevrangebyscore', MockRedis._call_zrangebyscore_args, _flatten_pairs),
+}
+
+
+def _command_table(cls):
+    """
+    Build the dictionary ``MockRedis.call`` uses, from each command name, in lower
+    and upper case, to its method name, argument adapter and response adapter.
+    """
+    table = {}
+    for name in dir(cls):
+        if not name.startswith('_') and callable(getattr(cls, name)):
+            table[name] = (name, None, None)
+    table.update(_COMMAND_ADAPTERS)
+    for name, entry in list(table.items()):
+        table[name.upper()] = entry
+    return table
+
+
+_COMMANDS = _command_table(MockRedis)
+
+
+def _command_entry(command):
+    """
+    Look up ``command`` in the command table, falling back to the method of the same name.
+    """
+    entry = _COMMANDS.get(command)
+    if entry is None:
+        command = command.lower()
+        entry = _COMMANDS.get(command, (command, None, None))
+    return entry
+
+
 def get_total_milliseconds(td):
     return int((td.days * 24 * 60 * 60 + td.seconds) * 1000 + td.microseconds / 1000.0)
 
 
+def to_milliseconds(value, unit=1):
+    """
+    Convert a timedelta, or a number of ``unit`` millisecond intervals, to integer milliseconds.
+    """
+    if isinstance(value, timedelta):
+        return get_total_milliseconds(value)
+    return int(value * unit)
+
+
 def mock_redis_client(**kwargs):
     """
     Mock common.util.redis_client so we
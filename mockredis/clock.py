@@ -3,6 +3,7 @@ Simple clock abstraction.
 """
 from abc import ABCMeta, abstractmethod
 from datetime import datetime
+from time import mktime, time
 
 
 class Clock(object):
@@ -17,8 +18,20 @@ class Clock(object):
     def now(self):
         pass
 
+    def now_ms(self):
+        """
+        The current time in integer milliseconds since the epoch.
+
+        Derived from ``now`` by default; subclasses may override it with something cheaper.
+        """
+        now = self.now()
+        return int(mktime(now.timetuple())) * 1000 + now.microsecond // 1000
+
 
 class SystemClock(Clock):
 
     def now(self):
         return datetime.now()
+
+    def now_ms(self):
+        return int(time() * 1000)
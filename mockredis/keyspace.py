@@ -0,0 +1,134 @@
+"""
+Dictionary of keys to values that can be scanned incrementally.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+
+from mockredis.skiplist import SkipList
+
+
+class KeySpace(defaultdict):
+    """
+    The 'Redis' store: a defaultdict that also keeps its keys in insertion order.
+
+    Every key is given an increasing sequence number when it is added and keeps
+    it until it is removed. ``scan`` uses sequence numbers as cursors, so a page
+    costs O(log N + count) and, like Redis, a full iteration returns every key
+    that was present for all of it. Unlike Redis it never returns a key twice.
+
+    With ``prefix_index``, the keys are also kept sorted in a skip list, so the
+    keys starting with a prefix can be found without visiting the others.
+    """
+
+    def __init__(self, default_factory=None, items=(), prefix_index=False):
+        self.prefix_indexed = prefix_index
+        self._clear_index()
+        super(KeySpace, self).__init__(default_factory)
+        self.update(items)
+
+    def _clear_index(self):
+        # the keys in the order they were added; removed keys leave a None
+        # tombstone until the next compaction
+        self._slots = []
+        # the sequence number of each slot, ascending
+        self._seqs = []
+        # dictionary from key to sequence number
+        self._key_seqs = {}
+        self._next_seq = 1
+        self._tombstones = 0
+        # the keys in sorted order, if indexing prefixes
+        self._sorted_keys = SkipList() if self.prefix_indexed else None
+
+    def _add(self, key):
+        self._key_seqs[key] = self._next_seq
+        self._slots.append(key)
+        self._seqs.append(self._next_seq)
+        self._next_seq += 1
+        if self._sorted_keys is not None:
+            self._sorted_keys.insert(key)
+
+    def _discard(self, key):
+        if self._sorted_keys is not None:
+            self._sorted_keys.remove(key)
+        seq = self._key_seqs.pop(key)
+        self._slots[bisect_left(self._seqs, seq)] = None
+        self._tombstones += 1
+        if self._tombstones > 64 and self._tombstones * 2 > len(self._slots):
+            self._compact()
+
+    def _compact(self):
+        live = [(seq, key) for seq, key in zip(self._seqs, self._slots) if key is not None]
+        self._seqs = [seq for seq, _ in live]
+        self._slots = [key for _, key in live]
+        self._tombstones = 0
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._add(key)
+        super(KeySpace, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super(KeySpace, self).__delitem__(key)
+        self._discard(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            self._discard(key)
+        return super(KeySpace, self).pop(key, *default)
+
+    def popitem(self):
+        key, value = super(KeySpace, self).popitem()
+        self._discard(key)
+        return key, value
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        super(KeySpace, self).clear()
+        self._clear_index()
+
+    def __reduce__(self):
+        return (self.__class__, (self.default_factory, (), self.prefix_indexed),
+                None, None, iter(self.items()))
+
+    def with_prefix(self, prefix, after=None, count=None):
+        """
+        Return, in order, up to ``count`` of the keys starting with ``prefix``
+        that sort after ``after``. Requires the prefix index.
+        """
+        if after is None:
+            rank = self._sorted_keys.bisect_left(prefix)
+        else:
+            rank = self._sorted_keys.bisect_right(after)
+        keys = []
+        for key in self._sorted_keys.iter_from(rank):
+            if not key.startswith(prefix) or len(keys) == count:
+                break
+            keys.append(key)
+        return keys
+
+    def scan(self, cursor, count):
+        """
+        Return ``[next cursor, keys]`` for up to ``count`` keys, starting at ``cursor``.
+
+        A cursor of 0 starts a new iteration, and 0 is returned once it is complete.
+        """
+        position = bisect_left(self._seqs, cursor)
+        slots = self._slots
+        keys = []
+        while position < len(slots) and len(keys) < count:
+            key = slots[position]
+            if key is not None:
+                keys.append(key)
+            position += 1
+        while position < len(slots) and slots[position] is None:
+            position += 1
+        next_cursor = self._seqs[position] if position < len(slots) else 0
+        return [next_cursor, keys]
@@ -0,0 +1,125 @@
+"""
+Redis glob-style patterns, as used by KEYS, the SCAN family and CONFIG GET.
+"""
+from collections import OrderedDict
+import re
+from threading import Lock
+
+
+# Number of compiled patterns kept, least recently used first
+CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_cache_lock = Lock()
+
+
+def _match_everything(value):
+    return True
+
+
+def _byte(pattern, index):
+    # a one byte slice, which is bytes on both python 2 and 3
+    return pattern[index:index + 1]
+
+
+def _translate_class(pattern, index):
+    """
+    Translate the bracket expression starting after the '[' at ``index`` - 1.
+
+    Returns the regex and the index just past the closing ']'. As in Redis, an
+    unterminated expression runs to the end of the pattern and a range whose
+    ends are the wrong way round is swapped.
+    """
+    negate = _byte(pattern, index) == b'^'
+    if negate:
+        index += 1
+    members = []
+    while index < len(pattern) and _byte(pattern, index) != b']':
+        char = _byte(pattern, index)
+        if char == b'\\' and index + 1 < len(pattern):
+            index += 1
+            char = _byte(pattern, index)
+        if _byte(pattern, index + 1) == b'-' and index + 2 < len(pattern) \
+                and _byte(pattern, index + 2) != b']':
+            end = _byte(pattern, index + 2)
+            if end == b'\\' and index + 3 < len(pattern):
+                index += 1
+                end = _byte(pattern, index + 2)
+            start, end = sorted((char, end))
+            members.append(re.escape(start) + b'-' + re.escape(end))
+            index += 3
+        else:
+            members.append(re.escape(char))
+            index += 1
+    index += 1
+    if not members:
+        return (b'.' if negate else b'(?!)'), index
+    return b'[' + (b'^' if negate else b'') + b''.join(members) + b']', index
+
+
+def translate(pattern):
+    """
+    Translate a Redis glob-style ``pattern`` (bytes) into an anchored regex.
+
+    Supports ``*``, ``?``, bracket expressions such as ``[abc]``, ``[a-z]`` and
+    ``[^x]``, and backslash escapes. Like Redis, it works on bytes, so ``?``
+    matches a single byte.
+    """
+    parts = []
+    index = 0
+    while index < len(pattern):
+        char = _byte(pattern, index)
+        index += 1
+        if char == b'*':
+            # collapse runs of stars so they don't backtrack needlessly
+            while _byte(pattern, index) == b'*':
+                index += 1
+            parts.append(b'.*')
+        elif char == b'?':
+            parts.append(b'.')
+        elif char == b'[':
+            regex, index = _translate_class(pattern, index)
+            parts.append(regex)
+        else:
+            if char == b'\\' and index < len(pattern):
+                char = _byte(pattern, index)
+                index += 1
+            parts.append(re.escape(char))
+    return b''.join(parts) + b'\\Z'
+
+
+def compile_pattern(pattern):
+    """
+    Return a function testing whether a key (bytes) matches ``pattern`` (bytes).
+
+    Compiled patterns are cached, so callers need not keep them.
+    """
+    with _cache_lock:
+        matcher = _cache.pop(pattern, None)
+        if matcher is None:
+            if pattern == b'*':
+                matcher = _match_everything
+            else:
+                matcher = re.compile(translate(pattern), re.DOTALL).match
+            if len(_cache) >= CACHE_SIZE:
+                _cache.popitem(last=False)
+        _cache[pattern] = matcher
+    return matcher
+
+
+def literal_prefix(pattern):
+    """
+    Return the literal text every key matching ``pattern`` (bytes) starts with.
+    """
+    prefix = []
+    index = 0
+    while index < len(pattern):
+        char = _byte(pattern, index)
+        if char in (b'*', b'?', b'['):
+            break
+        if char == b'\\' and index + 1 < len(pattern):
+            index += 1
+            char = _byte(pattern, index)
+        prefix.append(char)
+        index += 1
+    return b''.join(prefix)
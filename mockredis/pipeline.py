@@ -1,8 +1,29 @@
-from copy import deepcopy
-
 from mockredis.exceptions import RedisError, WatchError
 
 
+class _WatchedKeys(dict):
+    """
+    Dictionary from a pipeline's watched keys to their versions when watched.
+
+    The keys are unwatched when it is cleared or garbage collected, so a
+    pipeline dropped without being reset doesn't leave them watched. It holds
+    no reference to the pipeline, so it is collected even though the
+    pipeline's cached command wrappers make a reference cycle.
+    """
+
+    def __init__(self, mock_redis):
+        super(_WatchedKeys, self).__init__()
+        self.mock_redis = mock_redis
+
+    def clear(self):
+        for key in self:
+            self.mock_redis._unwatch(key)
+        super(_WatchedKeys, self).clear()
+
+    def __del__(self):
+        self.clear()
+
+
 class MockRedisPipeline(object):
     """
     Simulates a redis-python pipeline object.
@@ -10,36 +31,47 @@ class MockRedisPipeline(object):
 
     def __init__(self, mock_redis, transaction=True, shard_hint=None):
         self.mock_redis = mock_redis
+        # (bound method, args, kwargs) of each queued command
+        self.commands = []
+        self._watched_keys = _WatchedKeys(mock_redis)
         self._reset()
 
     def __getattr__(self, name):
         """
         Handle all unfound attributes by adding a deferred function call that
         delegates to the underlying mock redis instance.
+
+        The wrapper is kept on the pipeline, so later calls to the same command
+        don't come back here.
         """
         command = getattr(self.mock_redis, name)
         if not callable(command):
             raise AttributeError(name)
+        commands = self.commands
 
         def wrapper(*args, **kwargs):
             if self.watching and not self.explicit_transaction:
                 # execute the command immediately
                 return command(*args, **kwargs)
-            else:
-                self.commands.append(lambda: command(*args, **kwargs))
-                return self
+            commands.append((command, args, kwargs))
+            return self
+        setattr(self, name, wrapper)
         return wrapper
 
     def watch(self, *keys):
         """
-        Put the pipeline into immediate execution mode.
-        Does not actually watch any keys.
+        Put the pipeline into immediate execution mode and watch ``keys``.
+
+        Only the version of each key is recorded, so watching is cheap however
+        large the value, and a key changed and then changed back still counts
+        as modified.
         """
         if self.explicit_transaction:
             raise RedisError("Cannot issue a WATCH after a MULTI")
         self.watching = True
-        for key in keys:
-            self._watched_keys[key] = deepcopy(self.mock_redis.redis.get(self.mock_redis._encode(key)))  # noqa
+        for key in map(self.mock_redis._encode, keys):
+            if key not in self._watched_keys:
+                self._watched_keys[key] = self.mock_redis._watch(key)
 
     def multi(self):
         """
@@ -57,24 +89,25 @@ class MockRedisPipeline(object):
         Execute all of the saved commands and return results.
         """
         try:
-            for key, value in self._watched_keys.items():
-                if self.mock_redis.redis.get(self.mock_redis._encode(key)) != value:
+            for key, version in self._watched_keys.items():
+                if self.mock_redis._watched_version(key) != version:
                     raise WatchError("Watched variable changed.")
-            return [command() for command in self.commands]
+            return [command(*args, **kwargs) for command, args, kwargs in self.commands]
         finally:
             self._reset()
 
     def _reset(self):
         """
-        Reset instance variables.
+        Reset instance variables, unwatching any watched keys.
         """
-        self.commands = []
+        self._watched_keys.clear()
+        # cleared rather than replaced, as the cached wrappers append to it
+        del self.commands[:]
         self.watching = False
-        self._watched_keys = {}
         self.explicit_transaction = False
 
     def __exit__(self, *argv, **kwargs):
-        pass
+        self._reset()
 
     def __enter__(self, *argv, **kwargs):
         return self
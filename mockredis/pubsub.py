@@ -0,0 +1,117 @@
+from collections import deque
+
+
+class MockRedisPubSub(object):
+    """
+    Simulates a redis-python PubSub object.
+
+    Published messages are queued on each subscriber, in a ring buffer of at most
+    ``max_messages`` that drops the oldest message when full, much as Redis
+    limits the output buffer of a slow subscriber.
+
+    So that tests can't hang, ``get_message`` never waits for a message and
+    ``listen`` stops once the queue is empty.
+    """
+
+    def __init__(self, mock_redis, shard_hint=None, ignore_subscribe_messages=False,
+                 max_messages=None):
+        self.mock_redis = mock_redis
+        self.shard_hint = shard_hint
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        if max_messages is None:
+            max_messages = mock_redis.PUBSUB_MAX_MESSAGES
+        # Dictionary from subscribed channel to its handler, if any
+        self.channels = {}
+        self._messages = deque(maxlen=max_messages)
+
+    @property
+    def subscribed(self):
+        return bool(self.channels)
+
+    def subscribe(self, *args, **kwargs):
+        """
+        Subscribe to channels. Messages on channels given as keyword arguments
+        are passed to their value by ``get_message`` rather than returned.
+        """
+        new_channels = []
+        if args:
+            new_channels.extend((channel, None) for channel in
+                                self.mock_redis._list_or_args(args[0], args[1:]))
+        new_channels.extend(kwargs.items())
+        for channel, handler in new_channels:
+            channel = self.mock_redis._encode(channel)
+            if channel not in self.channels:
+                self.mock_redis._subscribe(channel, self)
+            self.channels[channel] = handler
+            self._queue_subscription('subscribe', channel)
+
+    def unsubscribe(self, *args):
+        """
+        Unsubscribe from ``args``, or from every channel if none are given.
+        """
+        if args:
+            channels = map(self.mock_redis._encode,
+                           self.mock_redis._list_or_args(args[0], args[1:]))
+        else:
+            channels = list(self.channels)
+        for channel in channels:
+            if channel in self.channels:
+                del self.channels[channel]
+                self.mock_redis._unsubscribe(channel, self)
+            self._queue_subscription('unsubscribe', channel)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0):
+        """
+        Return the oldest queued message, or None if there isn't one.
+        """
+        ignore_subscribe_messages = ignore_subscribe_messages or self.ignore_subscribe_messages
+        while self._messages:
+            message = self._messages.popleft()
+            if message['type'] != 'message':
+                if ignore_subscribe_messages:
+                    continue
+                return message
+            handler = self.channels.get(message['channel'])
+            if handler is None:
+                return message
+            handler(message)
+            return None
+        return None
+
+    def listen(self):
+        """
+        Yield queued messages, without waiting for more.
+        """
+        while self._messages:
+            message = self.get_message()
+            if message is not None:
+                yield message
+
+    def reset(self):
+        """
+        Unsubscribe from every channel and drop any queued messages.
+        """
+        if self.channels:
+            self.unsubscribe()
+        self._messages.clear()
+
+    close = reset
+
+    def _deliver(self, channel, message):
+        """
+        Queue ``message``, published to ``channel``.
+        """
+        self._messages.append({
+            'type': 'message',
+            'pattern': None,
+            'channel': channel,
+            'data': message,
+        })
+
+    def _queue_subscription(self, type_, channel):
+        self._messages.append({
+            'type': type_,
+            'pattern': None,
+            'channel': channel,
+            'data': len(self.channels),
+        })
@@ -0,0 +1,250 @@
+"""
+Chunked list used to store Redis lists.
+"""
+from bisect import bisect_right
+from itertools import islice
+
+
+class QuickList(object):
+    """
+    Redis-style quicklist: a sequence of fixed-size nodes (python lists).
+
+    Pushing and popping at either end is O(1) (amortized): the node lists keep
+    spare room in front of the head node, so adding or removing a head node
+    doesn't shift the others. Every node records the position of its first item
+    in a running coordinate, so index lookups bisect the node starts and cost
+    O(log N), and range reads are O(log N + M) for M items.
+    """
+    NODE_SIZE = 128
+
+    def __init__(self, items=()):
+        """
+        Create a quicklist, optionally populated from ``items``.
+        """
+        self.clear()
+        self.extend(items)
+
+    def clear(self):
+        """
+        Remove all items.
+        """
+        # the nodes, each holding up to NODE_SIZE items, from self._first on;
+        # the slots before it are spare room for new head nodes
+        self._nodes = []
+        # the position of the first item in each node; an item's position is
+        # its index plus self._head, so pushing onto the head only moves the
+        # first node's start rather than every node's
+        self._starts = []
+        self._first = 0
+        self._head = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for node in islice(self._nodes, self._first, None):
+            for item in node:
+                yield item
+
+    def __reversed__(self):
+        for number in range(len(self._nodes) - 1, self._first - 1, -1):
+            for item in reversed(self._nodes[number]):
+                yield item
+
+    def __eq__(self, other):
+        if not isinstance(other, QuickList):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return "QuickList({})".format(list(self))
+
+    def _locate(self, index):
+        """
+        Return the node number and offset within that node of an in-bounds index.
+        """
+        position = self._head + index
+        number = bisect_right(self._starts, position, self._first) - 1
+        return number, position - self._starts[number]
+
+    def _check_index(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("quicklist index out of range")
+        return index
+
+    def __getitem__(self, index):
+        """
+        Get the item at ``index``. Negative indexes count from the end.
+        """
+        if isinstance(index, slice):
+            raise TypeError("Slicing not supported, use range()")
+        number, offset = self._locate(self._check_index(index))
+        return self._nodes[number][offset]
+
+    def __setitem__(self, index, value):
+        """
+        Replace the item at ``index``. Negative indexes count from the end.
+        """
+        number, offset = self._locate(self._check_index(index))
+        self._nodes[number][offset] = value
+
+    def _push_node(self, node, start):
+        """
+        Add ``node``, whose first item has position ``start``, before the head node.
+        """
+        if not self._first:
+            # at least double the spare room, so that making it is O(1) per node (amortized)
+            spare = len(self._nodes) + 1
+            self._nodes[:0] = [None] * spare
+            self._starts[:0] = [None] * spare
+            self._first = spare
+        self._first -= 1
+        self._nodes[self._first] = node
+        self._starts[self._first] = start
+
+    def _pop_node(self):
+        """
+        Remove the head node.
+        """
+        self._nodes[self._first] = None
+        self._starts[self._first] = None
+        self._first += 1
+        self._reclaim()
+
+    def _reclaim(self):
+        """
+        Drop the spare room once it outgrows the nodes, which is O(1) per node removed
+        (amortized) and leaves enough removals before the next drop to pay for regrowing it.
+        """
+        if self._first > 2 * (len(self._nodes) - self._first) + 1:
+            del self._nodes[:self._first]
+            del self._starts[:self._first]
+            self._first = 0
+
+    def append(self, item):
+        """
+        Add ``item`` to the tail.
+        """
+        if self._length and len(self._nodes[-1]) < self.NODE_SIZE:
+            self._nodes[-1].append(item)
+        else:
+            self._nodes.append([item])
+            self._starts.append(self._head + self._length)
+        self._length += 1
+
+    def appendleft(self, item):
+        """
+        Add ``item`` to the head.
+        """
+        if self._length and len(self._nodes[self._first]) < self.NODE_SIZE:
+            self._nodes[self._first].insert(0, item)
+            self._starts[self._first] -= 1
+        else:
+            self._push_node([item], self._head - 1)
+        self._head -= 1
+        self._length += 1
+
+    def extend(self, items):
+        """
+        Add ``items`` to the tail, in order.
+        """
+        for item in items:
+            self.append(item)
+
+    def extendleft(self, items):
+        """
+        Add ``items`` to the head one at a time, which reverses their order.
+        """
+        for item in items:
+            self.appendleft(item)
+
+    def pop(self):
+        """
+        Remove and return the tail item.
+        """
+        if not self._length:
+            raise IndexError("pop from an empty quicklist")
+        node = self._nodes[-1]
+        item = node.pop()
+        if not node:
+            self._nodes.pop()
+            self._starts.pop()
+            self._reclaim()
+        self._length -= 1
+        return item
+
+    def popleft(self):
+        """
+        Remove and return the head item.
+        """
+        if not self._length:
+            raise IndexError("pop from an empty quicklist")
+        node = self._nodes[self._first]
+        item = node.pop(0)
+        self._starts[self._first] += 1
+        if not node:
+            self._pop_node()
+        self._head += 1
+        self._length -= 1
+        return item
+
+    def range(self, start, stop):
+        """
+        Return the items with indexes in [start, stop) as a list.
+        """
+        start = max(start, 0)
+        stop = min(stop, self._length)
+        if start >= stop:
+            return []
+        number, offset = self._locate(start)
+        items = []
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._nodes[number][offset:offset + remaining]
+            items.extend(chunk)
+            remaining -= len(chunk)
+            number += 1
+            offset = 0
+        return items
+
+    def trim(self, start, stop):
+        """
+        Keep only the items with indexes in [start, stop), dropping whole nodes where possible.
+        """
+        start = max(start, 0)
+        stop = max(min(stop, self._length), start)
+
+        remove = self._length - stop
+        while remove > 0:
+            node = self._nodes[-1]
+            if len(node) <= remove:
+                self._nodes.pop()
+                self._starts.pop()
+                self._reclaim()
+                remove -= len(node)
+                self._length -= len(node)
+            else:
+                del node[len(node) - remove:]
+                self._length -= remove
+                remove = 0
+
+        remove = min(start, self._length)
+        while remove > 0:
+            node = self._nodes[self._first]
+            if len(node) <= remove:
+                self._pop_node()
+                count = len(node)
+            else:
+                del node[:remove]
+                self._starts[self._first] += remove
+                count = remove
+            remove -= count
+            self._head += count
+            self._length -= count
@@ -2,7 +2,55 @@ import sys
 import threading
 from mockredis.exceptions import ResponseError
 
-LuaLock = threading.Lock()
+if sys.version_info >= (3, 0):
+    long = int
+
+# lupa is imported only once, the first time a script runs
+_lupa = None
+_lupa_import_lock = threading.Lock()
+
+# Python values passed to and from Lua as they are
+_PYTHON_NATIVE_TYPES = (str, bytes, int, long, float, bool, type(None))
+_LUA_NATIVE_TYPES = (str, int, long, float, bool)
+
+# Returns the length of a table followed by its elements; like Redis, the
+# table ends at its first nil, as the length of a table with holes is undefined
+_LUA_FROM_TABLE = """
+(function()
+    local unpack = table.unpack or unpack
+    return function(t)
+        local n = 0
+        while t[n + 1] ~= nil do
+            n = n + 1
+        end
+        return n, unpack(t, 1, n)
+    end
+end)()
+"""
+
+
+class ScriptRuntime(object):
+    """
+    The Lua runtime that scripts run against one client use.
+
+    Every client has its own runtime, so scripts against separate clients run
+    in parallel; scripts against the same client take turns under its lock.
+    """
+
+    def __init__(self, client):
+        self.lua = Script._import_lua().LuaRuntime(unpack_returned_tuples=True)
+        self.globals = self.lua.globals()
+        self.dependencies_loaded = False
+        # Unpacks a table into a tuple, so that it crosses into Python in one call
+        self.unpack_table = self.lua.eval(_LUA_FROM_TABLE)
+        # Dictionary from sha to the Lua function compiled from that script
+        self.functions = dict()
+
+        def _call(*call_args):
+            # client.call adapts native redis arguments to redis-py's
+            return Script._python_to_lua(self, client.call(*call_args))
+
+        self.globals.redis = self.lua.table_from({"call": _call})
 
 
 class Script(object):
@@ -18,9 +66,11 @@ class Script(object):
 
     def __call__(self, keys=[], args=[], client=None):
         """Execute the script, passing any required ``args``"""
-        with LuaLock:
-            client = client or self.registered_client
+        client = client or self.registered_client
 
+        # hold the client's lock, like its list commands do, so that no other
+        # thread changes its data while the script runs
+        with client._lock:
             if not client.script_exists(self.sha)[0]:
                 self.sha = client.script_load(self.script)
 
@@ -28,45 +78,52 @@ class Script(object):
 
     def _execute_lua(self, keys, args, client):
         """
-        Sets KEYS and ARGV alongwith redis.call() function in lua globals
-        and executes the lua redis script
+        Sets KEYS and ARGV in the client's lua globals and executes the
+        lua redis script, compiled into a function on its first run
         """
-        lua, lua_globals = Script._import_lua(self.load_dependencies)
-        lua_globals.KEYS = self._python_to_lua(keys)
-        lua_globals.ARGV = self._python_to_lua(args)
-
-        def _call(*call_args):
-            # redis-py and native redis commands are mostly compatible argument
-            # wise, but some exceptions need to be handled here:
-            if str(call_args[0]).lower() == 'lrem':
-                response = client.call(
-                    call_args[0], call_args[1],
-                    call_args[3],  # "count", default is 0
-                    call_args[2])
-            else:
-                response = client.call(*call_args)
-            return self._python_to_lua(response)
-
-        lua_globals.redis = {"call": _call}
-        return self._lua_to_python(lua.execute(self.script), return_status=True)
+        runtime = Script._runtime(client, self.load_dependencies)
+        function = runtime.functions.get(self.sha)
+        if function is None:
+            # like Redis, compile the script into a function once and call that
+            function = runtime.lua.eval("function()\n" + self.script + "\nend")
+            runtime.functions[self.sha] = function
+        runtime.globals.KEYS = Script._python_to_lua(runtime, keys)
+        runtime.globals.ARGV = Script._python_to_lua(runtime, args)
+        return Script._lua_to_python(runtime, function(), return_status=True)
 
     @staticmethod
-    def _import_lua(load_dependencies=True):
+    def _runtime(client, load_dependencies=True):
         """
-        Import lua and dependencies.
+        Return the ``ScriptRuntime`` of ``client``, made on first use.
 
         :param load_dependencies: should Lua library dependencies be loaded?
-        :raises: RuntimeError if Lua is not available
         """
-        try:
-            import lua
-        except ImportError:
-            raise RuntimeError("Lua not installed")
+        with client._lock:
+            if client._lua is None:
+                client._lua = ScriptRuntime(client)
+            runtime = client._lua
+            if load_dependencies and not runtime.dependencies_loaded:
+                Script._import_lua_dependencies(runtime.lua, runtime.globals)
+                runtime.dependencies_loaded = True
+        return runtime
+
+    @staticmethod
+    def _import_lua():
+        """
+        Import lupa, the first time it is needed.
 
-        lua_globals = lua.globals()
-        if load_dependencies:
-            Script._import_lua_dependencies(lua, lua_globals)
-        return lua, lua_globals
+        :raises: RuntimeError if Lua is not available
+        """
+        global _lupa
+        if _lupa is None:
+            with _lupa_import_lock:
+                if _lupa is None:
+                    try:
+                        import lupa
+                    except ImportError:
+                        raise RuntimeError("Lua not installed")
+                    _lupa = lupa
+        return _lupa
 
     @staticmethod
     def _import_lua_dependencies(lua, lua_globals):
@@ -86,94 +143,83 @@ class Script(object):
             - debug lib.
             - cmsgpack lib.
         """
-        if sys.platform not in ('darwin', 'windows'):
-            import ctypes
-            ctypes.CDLL('liblua5.2.so', mode=ctypes.RTLD_GLOBAL)
-
         try:
             lua_globals.cjson = lua.eval('require "cjson"')
-        except RuntimeError:
+        except Script._import_lua().LuaError:
             raise RuntimeError("cjson not installed")
 
     @staticmethod
-    def _lua_to_python(lval, return_status=False):
+    def _lua_to_python(runtime, lval, return_status=False):
         """
         Convert Lua object(s) into Python object(s), as at times Lua object(s)
         are not compatible with Python functions
         """
-        import lua
-        lua_globals = lua.globals()
         if lval is None:
             # Lua None --> Python None
             return None
-        if lua_globals.type(lval) == "table":
-            # Lua table --> Python list
-            pval = []
-            for i in lval:
-                if return_status:
-                    if i == 'ok':
-                        return lval[i]
-                    if i == 'err':
-                        raise ResponseError(lval[i])
-                pval.append(Script._lua_to_python(lval[i]))
-            return pval
-        elif isinstance(lval, long):
-            # Lua number --> Python long
-            return long(lval)
-        elif isinstance(lval, float):
-            # Lua number --> Python float
-            return float(lval)
-        elif lua_globals.type(lval) == "userdata":
-            # Lua userdata --> Python string
-            return str(lval)
-        elif lua_globals.type(lval) == "string":
-            # Lua string --> Python string
+        if type(lval) in _LUA_NATIVE_TYPES:
+            # Lua strings, numbers and booleans arrive as their Python equivalents
             return lval
-        elif lua_globals.type(lval) == "boolean":
-            # Lua boolean --> Python bool
-            return bool(lval)
-        raise RuntimeError("Invalid Lua type: " + str(lua_globals.type(lval)))
+        lua_type = Script._import_lua().lua_type(lval)
+        if lua_type == "table":
+            if return_status:
+                if lval["ok"] is not None:
+                    return lval["ok"]
+                if lval["err"] is not None:
+                    raise ResponseError(lval["err"])
+            # Lua table --> Python list, unpacked in a single call
+            values = runtime.unpack_table(lval)
+            if not isinstance(values, tuple):
+                # just the length of an empty table
+                return []
+            return [value if type(value) in _LUA_NATIVE_TYPES
+                    else Script._lua_to_python(runtime, value)
+                    for value in values[1:]]
+        raise RuntimeError("Invalid Lua type: " + str(lua_type))
 
     @staticmethod
-    def _python_to_lua(pval):
+    def _python_to_lua(runtime, pval):
         """
         Convert Python object(s) into Lua object(s), as at times Python object(s)
         are not compatible with Lua functions
         """
-        import lua
         if pval is None:
             # Python None --> Lua None
-            return lua.eval("")
+            return None
         if isinstance(pval, (list, tuple, set)):
             # Python list --> Lua table
             # e.g.: in lrange
             #     in Python returns: [v1, v2, v3]
             #     in Lua returns: {v1, v2, v3}
-            lua_list = lua.eval("{}")
-            lua_table = lua.eval("table")
-            for item in pval:
-                lua_table.insert(lua_list, Script._python_to_lua(item))
-            return lua_list
+            return Script._python_to_lua_table(runtime, pval)
         elif isinstance(pval, dict):
             # Python dict --> Lua dict
             # e.g.: in hgetall
             #     in Python returns: {k1:v1, k2:v2, k3:v3}
             #     in Lua returns: {k1, v1, k2, v2, k3, v3}
-            lua_dict = lua.eval("{}")
-            lua_table = lua.eval("table")
-            for k, v in pval.iteritems():
-                lua_table.insert(lua_dict, Script._python_to_lua(k))
-                lua_table.insert(lua_dict, Script._python_to_lua(v))
-            return lua_dict
-        elif isinstance(pval, str):
-            # Python string --> Lua userdata
+            return Script._python_to_lua_table(
+                runtime, [item for pair in pval.items() for item in pair])
+        elif isinstance(pval, (str, bytes)):
+            # Python string --> Lua string
             return pval
         elif isinstance(pval, bool):
             # Python bool--> Lua boolean
-            return lua.eval(str(pval).lower())
-        elif isinstance(pval, (int, long, float)):
+            return pval
+        elif isinstance(pval, (int, long)):
             # Python int --> Lua number
-            lua_globals = lua.globals()
-            return lua_globals.tonumber(str(pval))
+            return pval
+        elif isinstance(pval, float):
+            # Python float --> Lua number
+            return pval
 
         raise RuntimeError("Invalid Python type: " + str(type(pval)))
+
+    @staticmethod
+    def _python_to_lua_table(runtime, items):
+        """
+        Build a Lua table of ``items`` with one call into Lua, rather than one per element.
+        """
+        items = [item if type(item) in _PYTHON_NATIVE_TYPES
+                 else Script._python_to_lua(runtime, item)
+                 for item in items]
+        return runtime.lua.table_from(items)
@@ -0,0 +1,244 @@
+"""
+Indexable skip list.
+"""
+from random import Random
+
+# Picks node levels; private, so that skip lists don't consume or disturb the
+# global random stream of the code under test
+_random = Random()
+
+
+class _Node(object):
+    """
+    A skip list node.
+
+    ``forward[i]`` is the next node at level i and ``span[i]`` is the number of
+    level 0 hops that pointer covers, which is what makes the list indexable.
+    """
+    __slots__ = ("item", "forward", "span", "backward")
+
+    def __init__(self, item, level):
+        self.item = item
+        self.forward = [None] * level
+        self.span = [0] * level
+        self.backward = None
+
+
+class SkipList(object):
+    """
+    An ordered collection of comparable items, modelled after the span-tracking
+    skip list Redis uses for sorted sets.
+
+    Insertion, removal, rank and index lookups are all expected O(log N); range
+    reads are O(log N + M) for M returned items.
+    """
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self, items=()):
+        """
+        Create a skip list, optionally populated from ``items``.
+        """
+        self.clear()
+        for item in items:
+            self.insert(item)
+
+    def clear(self):
+        """
+        Remove all items.
+        """
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._tail = None
+        self._level = 1
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        node = self._head.forward[0]
+        while node is not None:
+            yield node.item
+            node = node.forward[0]
+
+    def __reversed__(self):
+        node = self._tail
+        while node is not None:
+            yield node.item
+            node = node.backward
+
+    def __reduce__(self):
+        # rebuild from the items rather than letting copy/pickle recurse
+        # through the node chain
+        return (self.__class__, (list(self),))
+
+    def __getitem__(self, index):
+        """
+        Get the item at ``index``. Negative indexes count from the end.
+        """
+        if isinstance(index, slice):
+            raise TypeError("Slicing not supported, use range()")
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("skip list index out of range")
+        return self._node_at(index).item
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and _random.random() < self.P:
+            level += 1
+        return level
+
+    def _node_at(self, index):
+        """
+        Return the node at (0-based, in-bounds) ``index``.
+        """
+        node = self._head
+        traversed = -1
+        for i in range(self._level - 1, -1, -1):
+            following = node.forward[i]
+            while following is not None and traversed + node.span[i] <= index:
+                traversed += node.span[i]
+                node = following
+                following = node.forward[i]
+            if traversed == index:
+                return node
+        return node
+
+    def insert(self, item):
+        """
+        Insert ``item``. Equal items are kept, after any existing ones.
+        """
+        update = [None] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        node = self._head
+        traversed = 0
+        for i in range(self._level - 1, -1, -1):
+            following = node.forward[i]
+            while following is not None and not item < following.item:
+                traversed += node.span[i]
+                node = following
+                following = node.forward[i]
+            rank[i] = traversed
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._length
+            self._level = level
+
+        new = _Node(item, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+
+        new.backward = None if update[0] is self._head else update[0]
+        if new.forward[0] is not None:
+            new.forward[0].backward = new
+        else:
+            self._tail = new
+        self._length += 1
+
+    def remove(self, item):
+        """
+        Remove one occurrence of ``item``, returning whether it was found.
+        """
+        update = [None] * self.MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            following = node.forward[i]
+            while following is not None and following.item < item:
+                node = following
+                following = node.forward[i]
+            update[i] = node
+
+        node = node.forward[0]
+        if node is None or node.item != item:
+            return False
+
+        for i in range(self._level):
+            if update[i].forward[i] is node:
+                update[i].span[i] += node.span[i] - 1
+                update[i].forward[i] = node.forward[i]
+            else:
+                update[i].span[i] -= 1
+        if node.forward[0] is not None:
+            node.forward[0].backward = node.backward
+        else:
+            self._tail = node.backward
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
+        return True
+
+    def bisect_left(self, item):
+        """
+        Return the number of items strictly less than ``item``.
+        """
+        rank = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            following = node.forward[i]
+            while following is not None and following.item < item:
+                rank += node.span[i]
+                node = following
+                following = node.forward[i]
+        return rank
+
+    def bisect_right(self, item):
+        """
+        Return the number of items less than or equal to ``item``.
+        """
+        rank = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            following = node.forward[i]
+            while following is not None and not item < following.item:
+                rank += node.span[i]
+                node = following
+                following = node.forward[i]
+        return rank
+
+    def index(self, item):
+        """
+        Return the index of ``item``, or None if it is not present.
+        """
+        rank = self.bisect_left(item)
+        if rank < self._length and self._node_at(rank).item == item:
+            return rank
+        return None
+
+    def range(self, start, stop):
+        """
+        Return the items with indexes in [start, stop) as a list.
+        """
+        start = max(start, 0)
+        stop = min(stop, self._length)
+        if start >= stop:
+            return []
+        node = self._node_at(start)
+        items = []
+        for _ in range(stop - start):
+            items.append(node.item)
+            node = node.forward[0]
+        return items
+
+    def iter_from(self, start):
+        """
+        Iterate over the items from index ``start`` onwards.
+        """
+        start = max(start, 0)
+        if start >= self._length:
+            return
+        node = self._node_at(start)
+        while node is not None:
+            yield node.item
+            node = node.forward[0]
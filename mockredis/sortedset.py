@@ -1,4 +1,34 @@
-from bisect import bisect_left, bisect_right
+from mockredis.skiplist import SkipList
+
+
+class _Infinity(object):
+    """
+    Compares greater than any member, so (score, _INFINITY) sorts after every
+    (score, member) pair with the same score.
+    """
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return self is other
+
+    def __gt__(self, other):
+        return self is not other
+
+    def __ge__(self, other):
+        return True
+
+    def __eq__(self, other):
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
+
+    def __hash__(self):
+        return id(self)
+
+
+_INFINITY = _Infinity()
 
 
 class SortedSet(object):
@@ -10,17 +40,16 @@ class SortedSet(object):
     1. A multimap from score to member
     2. A dictionary from member to score.
 
-    The multimap is implemented using a sorted list of (score, member) pairs. The bisect
-    operations used to maintain the multimap are O(log N), but insertion into and removal
-    from a list are O(N), so insertion and removal O(N). It should be possible to swap in
-    an indexable skip list to get the expected O(log N) behavior.
+    The multimap is implemented using an indexable skip list of (score, member) pairs,
+    so insertion, removal, rank and range lookups are all expected O(log N) (plus the
+    size of any returned range).
     """
     def __init__(self):
         """
         Create an empty sorted set.
         """
-        # sorted list of (score, member)
-        self._scores = []
+        # skip list of (score, member)
+        self._scores = SkipList()
         # dictionary from member to score
         self._members = {}
 
@@ -40,10 +69,10 @@ class SortedSet(object):
         return self.__repr__()
 
     def __repr__(self):
-        return "SortedSet({})".format(self._scores)
+        return "SortedSet({})".format(list(self._scores))
 
     def __eq__(self, other):
-        return self._scores == other._scores and self._members == other._members
+        return self._members == other._members
 
     def __ne__(self, other):
         return not self == other
@@ -81,8 +110,7 @@ class SortedSet(object):
         inserted (True) or updated (False)
         """
         found = self.remove(member)
-        index = bisect_left(self._scores, (score, member))
-        self._scores.insert(index, (score, member))
+        self._scores.insert((score, member))
         self._members[member] = score
         return not found
 
@@ -92,10 +120,8 @@ class SortedSet(object):
         """
         if member not in self:
             return False
-        score = self._members[member]
-        score_index = bisect_left(self._scores, (score, member))
-        del self._scores[score_index]
-        del self._members[member]
+        score = self._members.pop(member)
+        self._scores.remove((score, member))
         return True
 
     def score(self, member):
@@ -112,7 +138,7 @@ class SortedSet(object):
         score = self._members.get(member)
         if score is None:
             return None
-        return bisect_left(self._scores, (score, member))
+        return self._scores.bisect_left((score, member))
 
     def range(self, start, end, desc=False):
         """
@@ -122,9 +148,9 @@ class SortedSet(object):
             return []
 
         if desc:
-            return reversed(self._scores[len(self) - end - 1:len(self) - start])
+            return reversed(self._scores.range(len(self) - end - 1, len(self) - start))
         else:
-            return self._scores[start:end + 1]
+            return self._scores.range(start, end + 1)
 
     def scorerange(self, start, end, start_inclusive=True, end_inclusive=True):
         """
@@ -133,18 +159,18 @@ class SortedSet(object):
         if not self:
             return []
 
-        left = bisect_left(self._scores, (start,))
-        right = bisect_right(self._scores, (end,))
+        # (score,) sorts before and (score, _INFINITY) after every pair with that score
+        if start_inclusive:
+            left = self._scores.bisect_left((start,))
+        else:
+            left = self._scores.bisect_right((start, _INFINITY))
 
         if end_inclusive:
-            # end is inclusive
-            while right < len(self) and self._scores[right][0] == end:
-                right += 1
-
-        if not start_inclusive:
-            while left < right and self._scores[left][0] == start:
-                left += 1
-        return self._scores[left:right]
+            right = self._scores.bisect_right((end, _INFINITY))
+        else:
+            right = self._scores.bisect_left((end,))
+
+        return self._scores.range(left, right)
 
     def min_score(self):
         return self._scores[0][0]
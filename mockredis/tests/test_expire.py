@@ -0,0 +1,191 @@
+"""
+Tests for expiry don't yet support verification against redis-server.
+"""
+from datetime import datetime, timedelta
+from time import mktime
+
+from nose.tools import eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.clock import Clock, SystemClock
+
+
+class FakeClock(Clock):
+    """
+    A clock that only moves when told to.
+    """
+
+    def __init__(self):
+        self.time = datetime(2014, 1, 1)
+
+    def now(self):
+        return self.time
+
+    def advance(self, seconds):
+        self.time += timedelta(seconds=seconds)
+
+
+class TestRedisExpire(object):
+
+    def setup(self):
+        self.clock = FakeClock()
+        self.redis = MockRedis(clock=self.clock)
+
+    def test_do_expire(self):
+        self.redis.set("short", "value", ex=10)
+        self.redis.set("long", "value", ex=100)
+        self.redis.set("forever", "value")
+
+        self.clock.advance(50)
+        self.redis.do_expire()
+        ok_("short" not in self.redis)
+        ok_("long" in self.redis)
+        ok_("forever" in self.redis)
+
+        self.clock.advance(100)
+        self.redis.do_expire()
+        ok_("long" not in self.redis)
+        ok_("forever" in self.redis)
+
+    def test_do_expire_after_persist(self):
+        self.redis.set("key", "value", ex=10)
+        ok_(self.redis.persist("key"))
+        ok_(not self.redis.persist("key"))
+        self.clock.advance(20)
+        self.redis.do_expire()
+        ok_("key" in self.redis)
+        eq_(None, self.redis.ttl("key"))
+
+    def test_do_expire_after_set(self):
+        self.redis.set("key", "value", ex=10)
+        self.redis.set("key", "other")
+        self.clock.advance(20)
+        self.redis.do_expire()
+        eq_(b"other", self.redis.get("key"))
+
+    def test_do_expire_after_reexpire(self):
+        self.redis.set("key", "value")
+        self.redis.expire("key", 10)
+        self.redis.expire("key", 30)
+        self.clock.advance(20)
+        self.redis.do_expire()
+        ok_("key" in self.redis)
+        self.clock.advance(20)
+        self.redis.do_expire()
+        ok_("key" not in self.redis)
+
+    def test_rename_moves_timeout(self):
+        self.redis.set("old", "value", ex=10)
+        self.redis.set("new", "value", ex=100)
+        self.redis.rename("old", "new")
+        self.redis.set("old", "value")
+        self.clock.advance(20)
+        self.redis.do_expire()
+        ok_("new" not in self.redis)
+        ok_("old" in self.redis)
+
+    def test_repeated_expire_is_compacted(self):
+        self.redis.set("key", "value")
+        for seconds in range(1000):
+            self.redis.expire("key", seconds + 1)
+        ok_(len(self.redis._expiry_heap) < 100)
+        eq_(1000, self.redis.ttl("key"))
+
+    def test_lazy_expire_on_read(self):
+        self.redis.set("string", "value", ex=10)
+        self.redis.hset("hash", "field", "value")
+        self.redis.expire("hash", 10)
+        self.redis.rpush("list", "value")
+        self.redis.expire("list", 10)
+        eq_(b"value", self.redis.get("string"))
+
+        self.clock.advance(20)
+        eq_(None, self.redis.get("string"))
+        ok_(not self.redis.exists("string"))
+        eq_(b"none", self.redis.type("hash"))
+        eq_([], self.redis.lrange("list", 0, -1))
+        eq_([], self.redis.keys("*"))
+        eq_({}, self.redis.timeouts)
+
+    def test_lazy_expire_on_write(self):
+        self.redis.set("key", "value", ex=10)
+        self.redis.rpush("list", "old")
+        self.redis.expire("list", 10)
+
+        self.clock.advance(20)
+        ok_(self.redis.set("key", "new", nx=True))
+        eq_(None, self.redis.ttl("key"))
+        eq_(1, self.redis.rpush("list", "new"))
+        eq_([b"new"], self.redis.lrange("list", 0, -1))
+        eq_(None, self.redis.ttl("list"))
+
+    def test_lazy_expire_ttl(self):
+        redis = MockRedis(strict=True, clock=self.clock)
+        redis.set("key", "value", ex=10)
+        self.clock.advance(20)
+        eq_(-2, redis.ttl("key"))
+        eq_(False, redis.expire("key", 10))
+        eq_(0, redis.incr("key") - 1)
+
+    def test_tick(self):
+        for i in range(100):
+            self.redis.set("short{}".format(i), "value", ex=10)
+        self.redis.set("long", "value", ex=100)
+
+        eq_(0, self.redis.tick())
+        self.clock.advance(20)
+        eq_(100, self.redis.tick())
+        eq_(0, self.redis.tick())
+        eq_(1, len(self.redis.timeouts))
+        eq_(1, self.redis.dbsize())
+
+    def test_tick_skips_stale_timeouts(self):
+        lookups = MockRedis.ACTIVE_EXPIRE_CYCLE_LOOKUPS_PER_LOOP
+        for i in range(2 * lookups):
+            self.redis.set("sliding{}".format(i), "value", ex=5)
+            self.redis.expire("sliding{}".format(i), 100)
+            self.redis.set("persisted{}".format(i), "value", ex=5)
+            self.redis.persist("persisted{}".format(i))
+        for i in range(10):
+            self.redis.set("short{}".format(i), "value", ex=10)
+
+        self.clock.advance(20)
+        # the stale timeouts come first, but every due key is still reclaimed
+        eq_(10, self.redis.tick())
+        eq_(4 * lookups, self.redis.dbsize())
+        eq_(0, self.redis.tick())
+
+    def test_tick_time_limit(self):
+        lookups = MockRedis.ACTIVE_EXPIRE_CYCLE_LOOKUPS_PER_LOOP
+        for i in range(3 * lookups):
+            self.redis.set("short{}".format(i), "value", ex=10)
+
+        self.clock.advance(20)
+        self.redis.ACTIVE_EXPIRE_CYCLE_TIME_LIMIT = -1
+        eq_(lookups, self.redis.tick())
+        del self.redis.ACTIVE_EXPIRE_CYCLE_TIME_LIMIT
+        eq_(2 * lookups, self.redis.tick())
+
+    def test_active_expire_interval(self):
+        redis = MockRedis(clock=self.clock, active_expire_interval=1)
+        redis.set("key1", "value", ex=10)
+        self.clock.advance(20)
+        redis.set("key2", "value", ex=10)
+        eq_(1, redis.dbsize())
+        eq_([b"key2"], list(redis.timeouts))
+
+    def test_expireat(self):
+        timestamp = mktime(self.clock.time.timetuple())
+        self.redis.set("key", "value")
+        ok_(self.redis.expireat("key", timestamp + 10))
+        eq_(10000, self.redis.pttl("key"))
+        self.clock.advance(20)
+        ok_("key" not in self.redis)
+
+    def test_now_ms(self):
+        eq_(mktime(self.clock.time.timetuple()) * 1000, self.clock.now_ms())
+        self.clock.time += timedelta(microseconds=1500)
+        eq_(mktime(self.clock.time.timetuple()) * 1000 + 1, self.clock.now_ms())
+
+        clock = SystemClock()
+        ok_(abs(clock.now_ms() - Clock.now_ms(clock)) < 1000)
@@ -0,0 +1,95 @@
+from copy import deepcopy
+
+from nose.tools import eq_, ok_
+
+from mockredis.keyspace import KeySpace
+
+
+class TestKeySpace(object):
+    """
+    Tests the incrementally scannable keyspace.
+    """
+
+    def setup(self):
+        self.keyspace = KeySpace(dict)
+
+    def full_scan(self, count):
+        keys = []
+        cursor = 0
+        while True:
+            cursor, page = self.keyspace.scan(cursor, count)
+            ok_(len(page) <= count)
+            keys.extend(page)
+            if cursor == 0:
+                return keys
+
+    def test_scan_in_insertion_order(self):
+        for key in range(25):
+            self.keyspace[key] = key
+        eq_(list(range(25)), self.full_scan(1))
+        eq_(list(range(25)), self.full_scan(7))
+        eq_([0, list(range(25))], self.keyspace.scan(0, 100))
+
+    def test_scan_empty(self):
+        eq_([0, []], self.keyspace.scan(0, 10))
+        self.keyspace[b"key"] = b"value"
+        del self.keyspace[b"key"]
+        eq_([0, []], self.keyspace.scan(0, 10))
+
+    def test_scan_under_modification(self):
+        """
+        Keys present for the whole iteration are returned exactly once,
+        across removals that compact the index.
+        """
+        for key in range(1000):
+            self.keyspace[key] = key
+        keys = []
+        cursor = 0
+        while True:
+            cursor, page = self.keyspace.scan(cursor, 10)
+            keys.extend(page)
+            for key in page:
+                if key % 2 and key + 1 < 1000:
+                    # remove some keys that have not been returned yet
+                    self.keyspace.pop(key + 1)
+                    self.keyspace[key + 1000] = key
+            if cursor == 0:
+                break
+        survivors = [key for key in range(1000) if key in self.keyspace]
+        eq_(len(keys), len(set(keys)))
+        ok_(set(survivors) <= set(keys))
+
+    def test_mutators_keep_index(self):
+        self.keyspace.update({1: 1, 2: 2}, three=3)
+        self.keyspace.setdefault(4, 4)
+        self.keyspace[5]
+        self.keyspace[1] = "one"
+        self.keyspace.pop(2)
+        self.keyspace.pop(2, None)
+        eq_([1, "three", 4, 5], self.full_scan(2))
+        eq_({}, self.keyspace[5])
+
+        self.keyspace.clear()
+        eq_([], self.full_scan(2))
+
+    def test_copy(self):
+        self.keyspace.update({1: 1, 2: 2})
+        copied = deepcopy(self.keyspace)
+        copied[3] = 3
+        eq_([1, 2], self.full_scan(10))
+        eq_([0, [1, 2, 3]], copied.scan(0, 10))
+
+    def test_prefix_index(self):
+        keyspace = KeySpace(dict, prefix_index=True)
+        for key in [b"b:2", b"a:1", b"b:1", b"b", b"c:1", b"b:3"]:
+            keyspace[key] = key
+        del keyspace[b"b:2"]
+        eq_([b"b", b"b:1", b"b:3"], keyspace.with_prefix(b"b"))
+        eq_([b"b:1"], keyspace.with_prefix(b"b:", count=1))
+        eq_([b"b:3"], keyspace.with_prefix(b"b:", after=b"b:1"))
+        eq_([], keyspace.with_prefix(b"d"))
+
+        copied = deepcopy(keyspace)
+        keyspace.clear()
+        eq_([], keyspace.with_prefix(b""))
+        eq_([b"c:1"], copied.with_prefix(b"c"))
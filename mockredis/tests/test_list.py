@@ -1,4 +1,5 @@
 from contextlib import contextmanager
+from threading import Thread
 import time
 
 from nose.tools import assert_less, assert_raises, eq_
@@ -81,6 +82,35 @@ class TestRedisList(object):
         with assert_elapsed_time(expected=timeout):
             eq_(None, self.redis.blpop(LIST1, timeout))
 
+    def _blocked_pop(self, pop, results):
+        """
+        Start a thread that blocks popping LIST1 and give it time to block.
+        """
+        thread = Thread(target=lambda: results.append(pop(LIST1, 5)))
+        thread.start()
+        time.sleep(0.1)
+        return thread
+
+    def test_blpop_wakes_on_push(self):
+        results = []
+        thread = self._blocked_pop(self.redis.blpop, results)
+        with assert_elapsed_time(expected=0, delta=1):
+            self.redis.rpush(LIST1, VAL1)
+            thread.join(5)
+        eq_([(bLIST1, bVAL1)], results)
+        eq_([], self.redis.keys("*"))
+
+    def test_blocked_pops_served_in_order(self):
+        first, second = [], []
+        threads = [self._blocked_pop(self.redis.brpop, first),
+                   self._blocked_pop(self.redis.brpop, second)]
+        self.redis.lpush(LIST1, VAL1)
+        self.redis.lpush(LIST1, VAL2)
+        for thread in threads:
+            thread.join(5)
+        eq_([(bLIST1, bVAL1)], first)
+        eq_([(bLIST1, bVAL2)], second)
+
     def test_lpush(self):
         """
         Insertion maintains order but not uniqueness.
@@ -314,6 +344,7 @@ class TestRedisList(object):
         self._reinitialize_list(LIST1, *values)
         self.redis.ltrim(LIST1, -1, 2)
         eq_([], self.redis.lrange(LIST1, 0, -1))
+        eq_([], self.redis.keys("*"))
 
     def test_ltrim(self):
         values = [bVAL4, bVAL3, bVAL2, bVAL1]
@@ -402,6 +433,29 @@ class TestRedisList(object):
         self.redis.lset(LIST1, 0, VAL1)
         eq_([bVAL1], self.redis.lrange(LIST1, 0, -1))
 
+    def test_push_pop_both_ends(self):
+        for i in range(1000):
+            self.redis.lpush(LIST1, i)
+            self.redis.rpush(LIST1, -i)
+        eq_(2000, self.redis.llen(LIST1))
+        eq_([b"999", b"998"], self.redis.lrange(LIST1, 0, 1))
+        eq_([b"-998", b"-999"], self.redis.lrange(LIST1, -2, -1))
+        for i in reversed(range(1000)):
+            eq_(str(i).encode("utf8"), self.redis.lpop(LIST1))
+            eq_(str(-i).encode("utf8"), self.redis.rpop(LIST1))
+        eq_(0, self.redis.llen(LIST1))
+
+    def test_large_list_index_access(self):
+        self.redis.rpush(LIST1, *range(1000))
+        self.redis.lpush(LIST1, *range(-1, -1001, -1))
+        eq_([b"500", b"501", b"502"], self.redis.lrange(LIST1, 1500, 1502))
+        eq_(b"-1000", self.redis.lindex(LIST1, 0))
+        eq_(b"999", self.redis.lindex(LIST1, -1))
+        self.redis.lset(LIST1, 1500, "x")
+        eq_(b"x", self.redis.lindex(LIST1, 1500))
+        self.redis.ltrim(LIST1, 1000, 1004)
+        eq_([b"0", b"1", b"2", b"3", b"4"], self.redis.lrange(LIST1, 0, -1))
+
     def test_push_pop_returns_str(self):
         key = 'l'
         values = ['5', 5, [], {}]
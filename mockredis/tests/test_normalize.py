@@ -70,3 +70,21 @@ def test_normalize_command_response():
 
     for command, response, expected in cases:
         yield _test, command, response, expected
+
+
+def test_call():
+    redis = MockRedis(strict=True)
+
+    eq_(3, redis.call("RPUSH", "list", "a", "b", "a"))
+    eq_(2, redis.call("lrem", "list", 0, "a"))
+    eq_([b"b"], redis.call("LRange", "list", 0, -1))
+
+    eq_(1, redis.call("ZADD", "zset", 1.0, "member"))
+    eq_([b"member", 1.0], redis.call("zrange", "zset", 0, -1, False, True))
+
+    eq_(1, redis.call("DEL", "list"))
+    eq_(0, redis.call("exists", "list"))
+
+    eq_([0, 255, None], redis.call("BITFIELD", "bits", "SET", "u8", 0, 255,
+                                   "GET", "u8", 0, "overflow", "FAIL", "INCRBY", "u8", 0, 1))
+    eq_([255], redis.call("bitfield", "bits", "GET", "u8", 0))
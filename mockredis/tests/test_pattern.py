@@ -0,0 +1,45 @@
+from nose.tools import eq_, ok_
+
+from mockredis.pattern import compile_pattern, literal_prefix
+
+
+def test_patterns():
+    """
+    Patterns match as Redis' stringmatchlen does.
+    """
+    cases = [
+        (b"*", b"", True),
+        (b"*", b"any/thing\n", True),
+        (b"h?llo", b"hello", True),
+        (b"h?llo", b"hllo", False),
+        (b"h*llo", b"heeeello", True),
+        (b"h*llo", b"hello world", False),
+        (b"h[ae]llo", b"hallo", True),
+        (b"h[ae]llo", b"hillo", False),
+        (b"h[^e]llo", b"hallo", True),
+        (b"h[^e]llo", b"hello", False),
+        (b"h[a-b]llo", b"hbllo", True),
+        (b"h[b-a]llo", b"hbllo", True),
+        (b"h[a-b]llo", b"hcllo", False),
+        (b"h\\*llo", b"h*llo", True),
+        (b"h\\*llo", b"hello", False),
+        (b"h[\\]]llo", b"h]llo", True),
+        (b"a.b", b"a.b", True),
+        (b"a.b", b"axb", False),
+        (b"a+(b)", b"a+(b)", True),
+        (b"session:12:*", b"session:12:abc", True),
+        (b"session:12:*", b"session:123:abc", False),
+    ]
+    for pattern, key, expected in cases:
+        eq_(expected, bool(compile_pattern(pattern)(key)), (pattern, key))
+
+
+def test_cached():
+    ok_(compile_pattern(b"user:*") is compile_pattern(b"user:*"))
+
+
+def test_literal_prefix():
+    eq_(b"session:12:", literal_prefix(b"session:12:*"))
+    eq_(b"a*b", literal_prefix(b"a\\*b?"))
+    eq_(b"user", literal_prefix(b"user[0-9]"))
+    eq_(b"", literal_prefix(b"*"))
@@ -1,7 +1,9 @@
 from hashlib import sha1
+import gc
 
 from nose.tools import eq_
 
+from mockredis import MockRedis
 from mockredis.tests.fixtures import (assert_raises_redis_error,
                                       assert_raises_watch_error,
                                       setup,
@@ -26,6 +28,19 @@ class TestPipeline(object):
 
             eq_([b"foo", b"bar"], pipeline.execute())
 
+    def test_pipeline_reuse(self):
+        """
+        A pipeline can be executed again once its commands have run.
+        """
+        with self.redis.pipeline() as pipeline:
+            for value in range(3):
+                pipeline.rpush("list", value)
+            eq_([1, 2, 3], pipeline.execute())
+
+            pipeline.rpush("list", 3).lrange("list", 0, -1)
+            eq_([4, [b"0", b"1", b"2", b"3"]], pipeline.execute())
+            eq_([], pipeline.execute())
+
     def test_pipeline_args(self):
         """
         It should be possible to pass transaction and shard_hint.
@@ -179,3 +194,101 @@ class TestPipeline(object):
             pipeline.set("foo", "bar")
             with assert_raises_redis_error():
                 pipeline.multi()
+
+    def test_multi_with_watch_changed_back(self):
+        """
+        A watched key that is changed and then changed back still fails the transaction.
+        """
+        self.redis.set("foo", "bar")
+
+        with self.redis.pipeline() as pipeline:
+            pipeline.watch("foo")
+            self.redis.set("foo", "baz")
+            self.redis.set("foo", "bar")
+
+            pipeline.multi()
+            pipeline.get("foo")
+            with assert_raises_watch_error():
+                pipeline.execute()
+
+    def test_multi_with_watch_modified_in_place(self):
+        """
+        Modifying a watched collection fails the transaction.
+        """
+        self.redis.sadd("foo", "bar")
+        self.redis.hset("hash", "bar", "baz")
+
+        for modify in (lambda: self.redis.sadd("foo", "baz"),
+                       lambda: self.redis.hdel("hash", "bar"),
+                       lambda: self.redis.expire("foo", 30)):
+            with self.redis.pipeline() as pipeline:
+                pipeline.watch("foo", "hash")
+                modify()
+
+                pipeline.multi()
+                pipeline.scard("foo")
+                with assert_raises_watch_error():
+                    pipeline.execute()
+
+        # a write that changes nothing leaves the transaction alone
+        with self.redis.pipeline() as pipeline:
+            pipeline.watch("foo")
+            self.redis.sadd("foo", "bar")
+            self.redis.srem("foo", "missing")
+
+            pipeline.multi()
+            pipeline.scard("foo")
+            eq_([2], pipeline.execute())
+
+    def test_multi_with_watch_zadd_unchanged(self):
+        """
+        Adding a sorted set member again with the same score leaves the transaction alone.
+        """
+        self.redis_strict.zadd("foo", 1.0, "bar")
+
+        with self.redis_strict.pipeline() as pipeline:
+            pipeline.watch("foo")
+            eq_(0, self.redis_strict.zadd("foo", 1.0, "bar"))
+
+            pipeline.multi()
+            pipeline.zcard("foo")
+            eq_([1], pipeline.execute())
+
+        with self.redis_strict.pipeline() as pipeline:
+            pipeline.watch("foo")
+            eq_(0, self.redis_strict.zadd("foo", 2.0, "bar"))
+
+            pipeline.multi()
+            pipeline.zcard("foo")
+            with assert_raises_watch_error():
+                pipeline.execute()
+
+    def test_watch_ends_with_transaction(self):
+        """
+        Keys are no longer watched once the transaction has been executed.
+        """
+        with self.redis.pipeline() as pipeline:
+            pipeline.watch("foo")
+            pipeline.multi()
+            pipeline.set("foo", "bar")
+            eq_([True], pipeline.execute())
+
+            self.redis.set("foo", "baz")
+            pipeline.multi()
+            pipeline.get("foo")
+            eq_([b"baz"], pipeline.execute())
+
+    def test_dropped_pipeline_unwatches(self):
+        """
+        Keys watched by a pipeline that is dropped without being reset are unwatched.
+        """
+        redis = MockRedis()
+        pipeline = redis.pipeline()
+        pipeline.watch("foo", "bar")
+        pipeline.get("foo")
+        eq_(2, len(redis._watch_counts))
+
+        del pipeline
+        gc.collect()
+        eq_({}, redis._watch_counts)
+        eq_({}, redis._watch_versions)
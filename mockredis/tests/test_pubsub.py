@@ -1,7 +1,7 @@
 """
 Tests for pubsub don't yet support verification against redis-server.
 """
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 from mockredis import MockRedis
 
@@ -12,8 +12,61 @@ class TestRedisPubSub(object):
         self.redis = MockRedis()
         self.redis.flushdb()
 
+    def message(self, channel, data, type_='message'):
+        return {'type': type_, 'pattern': None, 'channel': channel, 'data': data}
+
     def test_publish(self):
         channel = 'ch#1'
         msg = 'test message'
-        self.redis.publish(channel, msg)
-        eq_(self.redis.pubsub[channel], [msg])
+        eq_(0, self.redis.publish(channel, msg))
+
+        pubsub = self.redis.pubsub()
+        pubsub.subscribe(channel)
+        eq_(self.message(b'ch#1', 1, 'subscribe'), pubsub.get_message())
+        eq_(None, pubsub.get_message())
+
+        eq_(1, self.redis.publish(channel, msg))
+        eq_(self.message(b'ch#1', b'test message'), pubsub.get_message())
+        eq_(None, pubsub.get_message())
+
+    def test_fan_out(self):
+        subscribers = [self.redis.pubsub(ignore_subscribe_messages=True) for _ in range(3)]
+        for pubsub in subscribers:
+            pubsub.subscribe('foo', 'bar')
+        subscribers[0].unsubscribe('bar')
+
+        eq_(3, self.redis.publish('foo', 1))
+        eq_(2, self.redis.publish('bar', 2))
+        eq_([self.message(b'foo', b'1')], list(subscribers[0].listen()))
+        for pubsub in subscribers[1:]:
+            eq_([self.message(b'foo', b'1'), self.message(b'bar', b'2')], list(pubsub.listen()))
+
+    def test_unsubscribe(self):
+        pubsub = self.redis.pubsub()
+        pubsub.subscribe(['foo', 'bar'])
+        ok_(pubsub.subscribed)
+        pubsub.unsubscribe('foo')
+        pubsub.unsubscribe()
+        ok_(not pubsub.subscribed)
+        eq_(0, self.redis.publish('foo', 'message'))
+        eq_(0, self.redis.publish('bar', 'message'))
+        eq_([self.message(b'foo', 1, 'subscribe'),
+             self.message(b'bar', 2, 'subscribe'),
+             self.message(b'foo', 1, 'unsubscribe'),
+             self.message(b'bar', 0, 'unsubscribe')],
+            list(pubsub.listen()))
+
+    def test_handler(self):
+        received = []
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(foo=received.append)
+        self.redis.publish('foo', 'message')
+        eq_(None, pubsub.get_message())
+        eq_([self.message(b'foo', b'message')], received)
+
+    def test_bounded_queue(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True, max_messages=3)
+        pubsub.subscribe('foo')
+        for value in range(10):
+            self.redis.publish('foo', value)
+        eq_([b'7', b'8', b'9'], [message['data'] for message in pubsub.listen()])
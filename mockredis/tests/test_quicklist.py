@@ -0,0 +1,118 @@
+from copy import deepcopy
+from random import randint
+
+from nose.tools import assert_raises, eq_, ok_
+
+from mockredis.quicklist import QuickList
+
+
+class TestQuickList(object):
+    """
+    Tests the chunked list backing Redis lists.
+    """
+
+    def setup(self):
+        self.quicklist = QuickList()
+        # small nodes so that the tests cross node boundaries
+        self.quicklist.NODE_SIZE = 4
+
+    def test_initially_empty(self):
+        eq_(0, len(self.quicklist))
+        eq_([], list(self.quicklist))
+        eq_([], self.quicklist.range(0, 10))
+        with assert_raises(IndexError):
+            self.quicklist.pop()
+        with assert_raises(IndexError):
+            self.quicklist.popleft()
+
+    def test_push_both_ends(self):
+        self.quicklist.extend(range(10))
+        self.quicklist.extendleft(range(-1, -11, -1))
+
+        eq_(list(range(-10, 10)), list(self.quicklist))
+        eq_(list(range(9, -11, -1)), list(reversed(self.quicklist)))
+        eq_(-10, self.quicklist[0])
+        eq_(0, self.quicklist[10])
+        eq_(9, self.quicklist[-1])
+        with assert_raises(IndexError):
+            self.quicklist[20]
+        eq_([-3, -2, -1, 0, 1], self.quicklist.range(7, 12))
+
+    def test_set_item(self):
+        self.quicklist.extend(range(10))
+        self.quicklist[5] = "five"
+        self.quicklist[-1] = "nine"
+        eq_([0, 1, 2, 3, 4, "five", 6, 7, 8, "nine"], list(self.quicklist))
+        with assert_raises(IndexError):
+            self.quicklist[10] = 10
+
+    def test_trim(self):
+        self.quicklist.extend(range(20))
+        self.quicklist.popleft()
+        self.quicklist.trim(3, 15)
+        eq_(list(range(4, 16)), list(self.quicklist))
+        eq_(9, self.quicklist[5])
+
+        self.quicklist.trim(5, 2)
+        eq_(0, len(self.quicklist))
+        eq_([], list(self.quicklist))
+
+    def test_matches_list(self):
+        """
+        Random operations agree with a python list.
+        """
+        expected = []
+        for step in range(3000):
+            operation = randint(0, 5)
+            if operation == 0:
+                self.quicklist.append(step)
+                expected.append(step)
+            elif operation == 1:
+                self.quicklist.appendleft(step)
+                expected.insert(0, step)
+            elif operation == 2 and expected:
+                eq_(expected.pop(), self.quicklist.pop())
+            elif operation == 3 and expected:
+                eq_(expected.pop(0), self.quicklist.popleft())
+            elif operation == 4 and expected:
+                index = randint(-len(expected), len(expected) - 1)
+                eq_(expected[index], self.quicklist[index])
+            elif operation == 5:
+                start = randint(0, len(expected) + 1)
+                eq_(expected[start:start + 9], self.quicklist.range(start, start + 9))
+
+        eq_(len(expected), len(self.quicklist))
+        eq_(expected, list(self.quicklist))
+
+    def test_head_nodes_reuse_spare_room(self):
+        """
+        Adding and removing head nodes doesn't shift or grow the node list.
+        """
+        self.quicklist.extend(range(8))
+        self.quicklist.appendleft(-1)
+        eq_(-1, self.quicklist.popleft())
+        room = len(self.quicklist._nodes)
+        for step in range(100):
+            self.quicklist.appendleft(step)
+            eq_(room, len(self.quicklist._nodes))
+            eq_(step, self.quicklist.popleft())
+            eq_(room, len(self.quicklist._nodes))
+        eq_(list(range(8)), list(self.quicklist))
+        eq_(list(range(7, -1, -1)), list(reversed(self.quicklist)))
+
+    def test_queue_reclaims_spare_room(self):
+        self.quicklist.extend(range(8))
+        for step in range(8, 1000):
+            self.quicklist.append(step)
+            eq_(step - 8, self.quicklist.popleft())
+        ok_(len(self.quicklist._nodes) <= 3 * 3 + 1)
+        eq_(list(range(992, 1000)), list(self.quicklist))
+        eq_(995, self.quicklist[3])
+
+    def test_equality_and_copy(self):
+        self.quicklist.extend(range(10))
+        copied = deepcopy(self.quicklist)
+        ok_(copied == self.quicklist)
+        copied.pop()
+        ok_(copied != self.quicklist)
+        ok_(QuickList(range(10)) == self.quicklist)
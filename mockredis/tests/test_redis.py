@@ -53,6 +53,40 @@ class TestRedis(object):
 
             self.redis.flushdb()
 
+    def test_type(self):
+        eq_(b'none', self.redis.type('key'))
+        self.redis.set('string', 'value')
+        self.redis.hset('hash', 'field', 'value')
+        self.redis.rpush('list', 'value')
+        self.redis.sadd('set', 'value')
+        self.redis.zadd('zset', 'value', 1)
+        for key in ['string', 'hash', 'list', 'set', 'zset']:
+            eq_(key.encode('utf-8'), self.redis.type(key))
+
+    def test_set_value_encoding(self):
+        """
+        Values are stored as redis-py encodes them, including subclasses of builtin types.
+        """
+        class Text(type(u'')):
+            pass
+
+        class Number(int):
+            pass
+
+        values = [
+            (b'bytes', b'bytes'),
+            (u'text \u2603', u'text \u2603'.encode('utf-8')),
+            (Text('subclass'), b'subclass'),
+            (5, b'5'),
+            (long(5), b'5'),
+            (Number(7), b'7'),
+            (1.5, b'1.5'),
+            (True, b'True'),
+        ]
+        for value, expected in values:
+            self.redis.set('key', value)
+            eq_(expected, self.redis.get('key'))
+
     def test_incr(self):
         '''
         incr, hincr when keys exist
@@ -92,6 +126,21 @@ class TestRedis(object):
         self.redis.decr('dkey')
         eq_(b'-1', self.redis.get('dkey'))
 
+    def test_counter_reads_as_string(self):
+        eq_(10, self.redis.incr('key', 10))
+        eq_(7, self.redis.decr('key', 3))
+        eq_(b'string', self.redis.type('key'))
+        eq_([b'7', None], self.redis.mget('key', 'missing'))
+        eq_(b'7', self.redis.getset('key', 'a'))
+        eq_(b'a', self.redis.get('key'))
+
+        self.redis.set('key', '41')
+        eq_(42, self.redis.incr('key'))
+        eq_(0, self.redis.getbit('key', 0))
+        eq_(1, self.redis.getbit('key', 2))
+        self.redis.setbit('key', 7, 1)
+        eq_(b'52', self.redis.get('key'))
+
     def test_ttl(self):
         self.redis.set('key', 'key')
         self.redis.expire('key', 30)
@@ -1,5 +1,6 @@
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
+from mockredis import MockRedis
 from mockredis.tests.fixtures import setup, teardown
 
 
@@ -118,6 +119,22 @@ class TestRedisScan(object):
             keys.add(k)
         eq_(keys, all_keys)
 
+    def test_scan_while_modifying(self):
+        """
+        Keys present for the whole scan are returned, however keys change.
+        """
+        keys = set()
+        cursor = '0'
+        while True:
+            cursor, page = self.redis.scan(cursor=cursor, count=2)
+            keys.update(page)
+            self.redis.delete('key_xyz_5')
+            self.redis.set('key_new_{}'.format(len(keys)), 'new')
+            if cursor == 0:
+                break
+        ok_(set(self.redis.keys('key_abc_*')) <= keys)
+        ok_(set(self.redis.keys('key_xyz_[1-4]')) <= keys)
+
 
 class TestRedisSScan(object):
     """SSCAN tests"""
@@ -328,3 +345,107 @@ class TestRedisHScan(object):
         for k, v in self.redis.hscan_iter('key', '*'):
             data[k] = v
         eq_(data, abcxyz)
+
+    def test_scan_while_modifying(self):
+        """
+        Fields present for the whole scan are returned with their current values.
+        """
+        data = {}
+        cursor = '0'
+        while True:
+            cursor, page = self.redis.hscan('key', cursor=cursor, count=2)
+            data.update(page)
+            self.redis.hdel('key', 'xyz_5')
+            self.redis.hset('key', 'xyz_4', 'four')
+            if cursor == 0:
+                break
+        ok_(b'xyz_5' not in data)
+        eq_(b'four', data[b'xyz_4'])
+        eq_(b'1', data[b'abc_1'])
+        eq_(10, len(data))
+
+    def test_concurrent_scans(self):
+        """
+        Scans of the same key running at the same time keep separate snapshots.
+        """
+        self.redis.delete('key')
+        self.redis.hmset('key', dict(('f{:02}'.format(i), i) for i in range(30)))
+        first_cursor, first_page = self.redis.hscan('key', cursor=0, count=10)
+        self.redis.hdel('key', 'f00', 'f01', 'f02')
+
+        second_cursor, second_page = self.redis.hscan('key', cursor=0, count=10)
+        ok_(second_cursor != first_cursor)
+        eq_(set('f{:02}'.format(i).encode('utf-8') for i in range(3, 13)), set(second_page))
+
+        fields = set(first_page)
+        while first_cursor != 0:
+            first_cursor, page = self.redis.hscan('key', cursor=first_cursor, count=10)
+            fields.update(page)
+        eq_(set('f{:02}'.format(i).encode('utf-8') for i in range(30)), fields)
+
+    def test_snapshots_dropped_with_key(self):
+        """
+        A key's snapshots are dropped when it is deleted, renamed or replaced,
+        but not when its fields change.
+        """
+        redis = MockRedis()
+
+        def start_scans():
+            redis.hmset('key', dict(('f{:02}'.format(i), i) for i in range(30)))
+            redis.hscan('key', cursor=0, count=10)
+            redis.hscan('key', cursor=0, count=10)
+            eq_(2, len(redis._scan_snapshots))
+
+        start_scans()
+        redis.hset('key', 'f00', 'changed')
+        redis.hdel('key', 'f01')
+        eq_(2, len(redis._scan_snapshots))
+        redis.delete('key')
+        eq_(0, len(redis._scan_snapshots))
+        eq_({}, redis._scan_keys)
+
+        start_scans()
+        redis.rename('key', 'other')
+        eq_(0, len(redis._scan_snapshots))
+
+        start_scans()
+        redis.set('key', 'value')
+        eq_(0, len(redis._scan_snapshots))
+        eq_({}, redis._scan_keys)
+
+    def test_scan_large_hash(self):
+        self.redis.hmset('key', dict(('field_{}'.format(i), i) for i in range(5000)))
+        fields = [field for field, _ in self.redis.hscan_iter('key', 'field_*', count=10)]
+        eq_(5000, len(fields))
+        eq_(5000, len(set(fields)))
+
+
+class TestRedisPrefixIndex(object):
+    """KEYS and SCAN with the prefix index enabled"""
+
+    def setup(self):
+        self.redis = MockRedis(prefix_index=True)
+        for i in range(30):
+            self.redis.set('session:{}:a'.format(i), i)
+            self.redis.set('user:{}'.format(i), i)
+
+    def test_keys(self):
+        eq_([b'session:10:a', b'session:11:a'], self.redis.keys('session:1?:a')[:2])
+        eq_(11, len(self.redis.keys('session:1*')))
+        eq_(60, len(self.redis.keys('*')))
+        eq_([b'user:7'], self.redis.keys('user:7'))
+        self.redis.delete('user:7')
+        eq_([], self.redis.keys('user:7'))
+
+    def test_scan_iter(self):
+        keys = []
+        for key in self.redis.scan_iter('user:*', count=4):
+            keys.append(key)
+            self.redis.delete('user:9')
+            self.redis.set('user:{}'.format(len(keys)), 'again')
+        eq_(sorted(keys), keys)
+        eq_(29, len(keys))
+        ok_(b'user:9' not in keys)
+        eq_([b'user:1', b'user:12'],
+            list(self.redis.scan_iter('user:1', count=1)) +
+            list(self.redis.scan_iter('user:1[2]*', count=1)))
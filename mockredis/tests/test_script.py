@@ -15,6 +15,7 @@ from mockredis.tests.test_constants import (
     LIST1, LIST2,
     SET1,
     VAL1, VAL2, VAL3, VAL4,
+    bVAL1, bVAL2, bVAL3, bVAL4,
     LPOP_SCRIPT
 )
 from mockredis.tests.fixtures import raises_response_error
@@ -34,12 +35,12 @@ class TestScript(object):
         self.LPOP_SCRIPT_SHA = sha1(LPOP_SCRIPT.encode("utf-8")).hexdigest()
 
         try:
-            lua, lua_globals = MockRedisScript._import_lua(load_dependencies=False)
+            self.runtime = MockRedisScript._runtime(self.redis, load_dependencies=False)
         except RuntimeError:
             raise SkipTest("mockredispy was not installed with lua support")
 
-        self.lua = lua
-        self.lua_globals = lua_globals
+        self.lua = self.runtime.lua
+        self.lua_globals = self.runtime.globals
 
         assert_equal_list = """
         function compare_list(list1, list2)
@@ -108,7 +109,7 @@ class TestScript(object):
         script(keys=[LIST1], args=[VAL1, VAL2])
 
         # validate insertion
-        eq_([VAL2, VAL1], self.redis.lrange(LIST1, 0, -1))
+        eq_([bVAL2, bVAL1], self.redis.lrange(LIST1, 0, -1))
 
     def test_register_script_lpop(self):
         self.redis.lpush(LIST1, VAL2, VAL1)
@@ -120,7 +121,7 @@ class TestScript(object):
 
         # validate lpop
         eq_(VAL1, list_item)
-        eq_([VAL2], self.redis.lrange(LIST1, 0, -1))
+        eq_([bVAL2], self.redis.lrange(LIST1, 0, -1))
 
     def test_register_script_rpoplpush(self):
         self.redis.lpush(LIST1, VAL2, VAL1)
@@ -132,8 +133,8 @@ class TestScript(object):
         script(keys=[LIST1, LIST2])
 
         # validate rpoplpush
-        eq_([VAL1], self.redis.lrange(LIST1, 0, -1))
-        eq_([VAL2, VAL3, VAL4], self.redis.lrange(LIST2, 0, -1))
+        eq_([bVAL1], self.redis.lrange(LIST1, 0, -1))
+        eq_([bVAL2, bVAL3, bVAL4], self.redis.lrange(LIST2, 0, -1))
 
     def test_register_script_rpop_lpush(self):
         self.redis.lpush(LIST1, VAL2, VAL1)
@@ -148,8 +149,8 @@ class TestScript(object):
         script(keys=[LIST1, LIST2])
 
         # validate rpop and then lpush
-        eq_([VAL1], self.redis.lrange(LIST1, 0, -1))
-        eq_([VAL2, VAL3, VAL4], self.redis.lrange(LIST2, 0, -1))
+        eq_([bVAL1], self.redis.lrange(LIST1, 0, -1))
+        eq_([bVAL2, bVAL3, bVAL4], self.redis.lrange(LIST2, 0, -1))
 
     def test_register_script_client(self):
         # lpush two values in LIST1 in first instance of redis
@@ -168,8 +169,8 @@ class TestScript(object):
 
         # validate lpop from LIST1 in redis2
         eq_(VAL3, list_item)
-        eq_([VAL4], redis2.lrange(LIST1, 0, -1))
-        eq_([VAL1, VAL2], self.redis.lrange(LIST1, 0, -1))
+        eq_([bVAL4], redis2.lrange(LIST1, 0, -1))
+        eq_([bVAL1, bVAL2], self.redis.lrange(LIST1, 0, -1))
 
     def test_eval_lpush(self):
         # lpush two values
@@ -177,7 +178,7 @@ class TestScript(object):
         self.redis.eval(script_content, 1, LIST1, VAL1, VAL2)
 
         # validate insertion
-        eq_([VAL2, VAL1], self.redis.lrange(LIST1, 0, -1))
+        eq_([bVAL2, bVAL1], self.redis.lrange(LIST1, 0, -1))
 
     def test_eval_lpop(self):
         self.redis.lpush(LIST1, VAL2, VAL1)
@@ -188,7 +189,7 @@ class TestScript(object):
 
         # validate lpop
         eq_(VAL1, list_item)
-        eq_([VAL2], self.redis.lrange(LIST1, 0, -1))
+        eq_([bVAL2], self.redis.lrange(LIST1, 0, -1))
 
     def test_eval_lrem(self):
         self.redis.delete(LIST1)
@@ -240,6 +241,38 @@ class TestScript(object):
         itemType = script(keys=[LIST1], args=[0, -1])
         eq_('table', itemType)
 
+    def test_script_large_lrange(self):
+        values = [str(value) for value in range(5000)]
+        self.redis.rpush(LIST1, *values)
+        script_content = """
+        local items = redis.call('LRANGE', KEYS[1], 0, -1)
+        return {#items, items[1], items[#items]}
+        """
+        script = self.redis.register_script(script_content)
+        eq_([5000, "0", "4999"], script(keys=[LIST1]))
+
+        script = self.redis.register_script("return redis.call('LRANGE', KEYS[1], 0, -1)")
+        eq_(values, script(keys=[LIST1]))
+
+    def test_script_nested_tables(self):
+        script_content = "return {1, {'a', {2.5, true}}, {}, ARGV[1]}"
+        script = self.redis.register_script(script_content)
+        eq_([1, ["a", [2.5, True]], [], VAL1], script(args=[VAL1]))
+
+    def test_script_table_with_holes(self):
+        # like Redis, a returned table ends at its first nil
+        script = self.redis.register_script("""
+        local t = {}
+        for i = 1, 8 do
+            t[i] = i
+        end
+        t[3] = nil
+        return t
+        """)
+        eq_([1, 2], script())
+        script = self.redis.register_script("local t = {} t[2] = 'b' return t")
+        eq_([], script())
+
     def test_script_hgetall(self):
         myhash = {"k1": "v1"}
         self.redis.hmset("myhash", myhash)
@@ -270,6 +303,53 @@ class TestScript(object):
         eq_(VAL1, self.redis.evalsha(sha, 1, LIST1))
         eq_(0, self.redis.llen(LIST1))
 
+    def test_evalsha_repeated(self):
+        self.redis.lpush(LIST1, VAL2, VAL1)
+        sha = self.redis.script_load(LPOP_SCRIPT)
+
+        eq_(VAL1, self.redis.evalsha(sha, 1, LIST1))
+        eq_(VAL2, self.redis.evalsha(sha, 1, LIST1))
+        eq_(None, self.redis.evalsha(sha, 1, LIST1))
+
+        # flushed scripts can no longer be run
+        self.redis.script_flush()
+        with assert_raises(RedisError):
+            self.redis.evalsha(sha, 1, LIST1)
+
+    def test_evalsha_compiles_once_per_client(self):
+        self.redis.rpush(LIST1, VAL1, VAL2)
+        redis2 = MockRedis(load_lua_dependencies=False)
+        redis2.rpush(LIST1, VAL3, VAL4)
+        sha = self.redis.script_load(LPOP_SCRIPT)
+        eq_(sha, redis2.script_load(LPOP_SCRIPT))
+
+        eq_(VAL1, self.redis.evalsha(sha, 1, LIST1))
+        function = self.redis._lua.functions[sha]
+        eq_(None, redis2._lua)
+
+        # the second client compiles the script into its own runtime, once
+        eq_(VAL3, redis2.evalsha(sha, 1, LIST1))
+        function2 = redis2._lua.functions[sha]
+        ok_(redis2._lua is not self.redis._lua)
+        ok_(function2 is not function)
+        eq_(VAL4, redis2.evalsha(sha, 1, LIST1))
+        ok_(redis2._lua.functions[sha] is function2)
+
+        eq_(VAL2, self.redis.evalsha(sha, 1, LIST1))
+        ok_(self.redis._lua.functions[sha] is function)
+
+        # as does a script registered with another client
+        script = self.redis.register_script("return redis.call('LLEN', KEYS[1])")
+        eq_(0, script(keys=[LIST1], client=redis2))
+        function3 = redis2._lua.functions[script.sha]
+        eq_(0, script(keys=[LIST1], client=redis2))
+        ok_(redis2._lua.functions[script.sha] is function3)
+        ok_(script.sha not in self.redis._lua.functions)
+
+    def test_script_ending_with_comment(self):
+        script_content = "return redis.call('ECHO', ARGV[1]) -- no trailing newline"
+        eq_(VAL1, self.redis.eval(script_content, 0, VAL1))
+
     def test_script_exists(self):
         script = LPOP_SCRIPT
         sha = self.LPOP_SCRIPT_SHA
@@ -294,42 +374,46 @@ class TestScript(object):
 
     def test_lua_to_python_none(self):
         lval = self.lua.eval("")
-        pval = MockRedisScript._lua_to_python(lval)
+        pval = MockRedisScript._lua_to_python(self.runtime, lval)
         ok_(pval is None)
 
     def test_lua_to_python_list(self):
         lval = self.lua.eval('{"val1", "val2"}')
-        pval = MockRedisScript._lua_to_python(lval)
+        pval = MockRedisScript._lua_to_python(self.runtime, lval)
         ok_(isinstance(pval, list))
         eq_(["val1", "val2"], pval)
 
+    def test_lua_to_python_list_with_holes(self):
+        lval = self.lua.eval('{"val1", "val2", nil, "val4", "val5", "val6", "val7", "val8"}')
+        eq_(["val1", "val2"], MockRedisScript._lua_to_python(self.runtime, lval))
+
     def test_lua_to_python_long(self):
         lval = self.lua.eval('22')
-        pval = MockRedisScript._lua_to_python(lval)
+        pval = MockRedisScript._lua_to_python(self.runtime, lval)
         ok_(isinstance(pval, long))
         eq_(22, pval)
 
     def test_lua_to_python_flota(self):
         lval = self.lua.eval('22.2')
-        pval = MockRedisScript._lua_to_python(lval)
+        pval = MockRedisScript._lua_to_python(self.runtime, lval)
         ok_(isinstance(pval, float))
         eq_(22.2, pval)
 
     def test_lua_to_python_string(self):
         lval = self.lua.eval('"somestring"')
-        pval = MockRedisScript._lua_to_python(lval)
+        pval = MockRedisScript._lua_to_python(self.runtime, lval)
         ok_(isinstance(pval, str))
         eq_("somestring", pval)
 
     def test_lua_to_python_bool(self):
         lval = self.lua.eval('true')
-        pval = MockRedisScript._lua_to_python(lval)
+        pval = MockRedisScript._lua_to_python(self.runtime, lval)
         ok_(isinstance(pval, bool))
         eq_(True, pval)
 
     def test_python_to_lua_none(self):
         pval = None
-        lval = MockRedisScript._python_to_lua(pval)
+        lval = MockRedisScript._python_to_lua(self.runtime, pval)
         is_null = """
         function is_null(var1)
             return var1 == nil
@@ -337,46 +421,48 @@ class TestScript(object):
         return is_null
         """
         lua_is_null = self.lua.execute(is_null)
-        ok_(MockRedisScript._lua_to_python(lua_is_null(lval)))
+        ok_(MockRedisScript._lua_to_python(self.runtime, lua_is_null(lval)))
 
     def test_python_to_lua_string(self):
         pval = "somestring"
-        lval = MockRedisScript._python_to_lua(pval)
+        lval = MockRedisScript._python_to_lua(self.runtime, pval)
         lval_expected = self.lua.eval('"somestring"')
         eq_("string", self.lua_globals.type(lval))
         eq_(lval_expected, lval)
 
     def test_python_to_lua_list(self):
         pval = ["abc", "xyz"]
-        lval = MockRedisScript._python_to_lua(pval)
+        lval = MockRedisScript._python_to_lua(self.runtime, pval)
         lval_expected = self.lua.eval('{"abc", "xyz"}')
         self.lua_assert_equal_list(lval_expected, lval)
 
     def test_python_to_lua_dict(self):
         pval = {"k1": "v1", "k2": "v2"}
-        lval = MockRedisScript._python_to_lua(pval)
+        lval = MockRedisScript._python_to_lua(self.runtime, pval)
         lval_expected = self.lua.eval('{"k1", "v1", "k2", "v2"}')
         self.lua_assert_equal_list_with_pairs(lval_expected, lval)
 
     def test_python_to_lua_long(self):
         pval = long(10)
-        lval = MockRedisScript._python_to_lua(pval)
+        lval = MockRedisScript._python_to_lua(self.runtime, pval)
         lval_expected = self.lua.eval('10')
         eq_("number", self.lua_globals.type(lval))
-        ok_(MockRedisScript._lua_to_python(self.lua_compare_val(lval_expected, lval)))
+        ok_(MockRedisScript._lua_to_python(self.runtime,
+                                           self.lua_compare_val(lval_expected, lval)))
 
     def test_python_to_lua_float(self):
         pval = 10.1
-        lval = MockRedisScript._python_to_lua(pval)
+        lval = MockRedisScript._python_to_lua(self.runtime, pval)
         lval_expected = self.lua.eval('10.1')
         eq_("number", self.lua_globals.type(lval))
-        ok_(MockRedisScript._lua_to_python(self.lua_compare_val(lval_expected, lval)))
+        ok_(MockRedisScript._lua_to_python(self.runtime,
+                                           self.lua_compare_val(lval_expected, lval)))
 
     def test_python_to_lua_boolean(self):
         pval = True
-        lval = MockRedisScript._python_to_lua(pval)
+        lval = MockRedisScript._python_to_lua(self.runtime, pval)
         eq_("boolean", self.lua_globals.type(lval))
-        ok_(MockRedisScript._lua_to_python(lval))
+        ok_(MockRedisScript._lua_to_python(self.runtime, lval))
 
     def test_lua_ok_return(self):
         script_content = "return {ok='OK'}"
@@ -412,3 +498,55 @@ return entry
 
         for thread in active_threads:
             thread.join()
+
+    def test_concurrent_lua_clients(self):
+        """
+        Scripts run concurrently against separate clients each see only their own data.
+        """
+        script_content = "return redis.call('INCR', KEYS[1])"
+        clients = [MockRedis(load_lua_dependencies=False) for _ in range(4)]
+        results = {}
+
+        def lua_thread(client):
+            script = client.register_script(script_content)
+            results[id(client)] = [script(keys=["counter"]) for _ in range(200)]
+
+        active_threads = [threading.Thread(target=lua_thread, args=(client,))
+                          for client in clients]
+        for thread in active_threads:
+            thread.start()
+        for thread in active_threads:
+            thread.join()
+
+        for client in clients:
+            eq_(list(range(1, 201)), results[id(client)])
+            eq_(b"200", client.get("counter"))
+
+    def test_lua_clients_run_in_parallel(self):
+        """
+        A script against one client needn't wait for a script against another to finish.
+        """
+        clients = [MockRedis(load_lua_dependencies=False) for _ in range(2)]
+        started = [threading.Event() for _ in clients]
+        results = [None for _ in clients]
+
+        def wait_for_other(index):
+            def echo(value):
+                # only returns True if the other script starts while this one runs
+                started[index].set()
+                return started[1 - index].wait(5)
+            return echo
+
+        def lua_thread(index):
+            clients[index].echo = wait_for_other(index)
+            script = clients[index].register_script("return redis.call('ECHO', 'ready')")
+            results[index] = script()
+
+        active_threads = [threading.Thread(target=lua_thread, args=(index,))
+                          for index in range(len(clients))]
+        for thread in active_threads:
+            thread.start()
+        for thread in active_threads:
+            thread.join()
+
+        eq_([True, True], results)
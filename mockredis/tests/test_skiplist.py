@@ -0,0 +1,108 @@
+from copy import deepcopy
+from random import getstate, randint, shuffle
+
+from nose.tools import assert_raises, eq_, ok_
+
+from mockredis.skiplist import SkipList
+
+
+class TestSkipList(object):
+    """
+    Tests the indexable skip list backing sorted sets.
+    """
+
+    def setup(self):
+        self.skiplist = SkipList()
+
+    def test_initially_empty(self):
+        eq_(0, len(self.skiplist))
+        eq_([], list(self.skiplist))
+        eq_([], list(reversed(self.skiplist)))
+        eq_([], self.skiplist.range(0, 10))
+        eq_([], list(self.skiplist.iter_from(0)))
+        eq_([], list(self.skiplist.iter_from(-1)))
+
+    def test_insert_keeps_order(self):
+        values = list(range(200))
+        shuffle(values)
+        for value in values:
+            self.skiplist.insert(value)
+
+        eq_(200, len(self.skiplist))
+        eq_(list(range(200)), list(self.skiplist))
+        eq_(list(reversed(range(200))), list(reversed(self.skiplist)))
+
+    def test_index_access(self):
+        for value in range(0, 100, 2):
+            self.skiplist.insert(value)
+
+        eq_(0, self.skiplist[0])
+        eq_(20, self.skiplist[10])
+        eq_(98, self.skiplist[-1])
+        with assert_raises(IndexError):
+            self.skiplist[50]
+        eq_(10, self.skiplist.index(20))
+        eq_(None, self.skiplist.index(21))
+        eq_([20, 22, 24], self.skiplist.range(10, 13))
+        eq_([96, 98], self.skiplist.range(48, 100))
+        eq_([94, 96, 98], list(self.skiplist.iter_from(47)))
+        eq_(list(range(0, 100, 2)), list(self.skiplist.iter_from(-5)))
+
+    def test_global_random_untouched(self):
+        state = getstate()
+        for value in range(100):
+            self.skiplist.insert(value)
+        ok_(getstate() == state)
+
+    def test_bisect(self):
+        for value in [1, 2, 2, 2, 3]:
+            self.skiplist.insert(value)
+
+        eq_(1, self.skiplist.bisect_left(2))
+        eq_(4, self.skiplist.bisect_right(2))
+        eq_(0, self.skiplist.bisect_left(0))
+        eq_(5, self.skiplist.bisect_right(10))
+
+    def test_remove(self):
+        for value in range(10):
+            self.skiplist.insert(value)
+
+        ok_(self.skiplist.remove(0))
+        ok_(self.skiplist.remove(9))
+        ok_(self.skiplist.remove(5))
+        ok_(not self.skiplist.remove(5))
+
+        eq_(7, len(self.skiplist))
+        eq_([1, 2, 3, 4, 6, 7, 8], list(self.skiplist))
+        eq_([8, 7, 6, 4, 3, 2, 1], list(reversed(self.skiplist)))
+        eq_(6, self.skiplist[4])
+
+    def test_matches_sorted_list(self):
+        """
+        Random inserts and removals agree with a sorted python list.
+        """
+        expected = []
+        for _ in range(2000):
+            value = randint(0, 300)
+            if value in expected and randint(0, 1):
+                expected.remove(value)
+                ok_(self.skiplist.remove(value))
+            else:
+                expected.append(value)
+                expected.sort()
+                self.skiplist.insert(value)
+
+        eq_(expected, list(self.skiplist))
+        eq_(expected[::-1], list(reversed(self.skiplist)))
+        for index in range(0, len(expected), 7):
+            eq_(expected[index], self.skiplist[index])
+            eq_(expected[index:index + 5], self.skiplist.range(index, index + 5))
+
+    def test_deepcopy(self):
+        for value in range(5000):
+            self.skiplist.insert(value)
+
+        copied = deepcopy(self.skiplist)
+        self.skiplist.remove(0)
+        eq_(5000, len(copied))
+        eq_(0, copied[0])
@@ -106,3 +106,30 @@ class TestSortedSet(object):
             self.zset.scorerange(1.0, 1.1, start_inclusive=True, end_inclusive=True))
         eq_([(1.0, "one"), (1.0, "uno"), (1.1, "uno_dot_one"), (2.0, "two")],
             self.zset.scorerange(1.0, 2.0, start_inclusive=True, end_inclusive=True))
+
+    def test_range(self):
+        self.zset["one"] = 1.0
+        self.zset["two"] = 2.0
+        self.zset["three"] = 3.0
+        eq_([(1.0, "one"), (2.0, "two")], self.zset.range(0, 1))
+        eq_([(3.0, "three"), (2.0, "two")], list(self.zset.range(0, 1, desc=True)))
+        eq_([(2.0, "two"), (3.0, "three")], self.zset.range(1, 2))
+        eq_([(1.0, "one")], list(self.zset.range(2, 2, desc=True)))
+
+    def test_large_set(self):
+        """
+        Ranks stay consistent as members are inserted, updated and removed.
+        """
+        for i in range(1000):
+            self.zset.insert("member{}".format(i), float(i % 100))
+        for i in range(0, 1000, 2):
+            self.zset.insert("member{}".format(i), float(i))
+        for i in range(0, 1000, 3):
+            self.zset.remove("member{}".format(i))
+
+        expected = sorted((score, member) for member, score in self.zset._members.items())
+        eq_(expected, list(self.zset))
+        for index, (score, member) in enumerate(expected):
+            eq_(index, self.zset.rank(member))
+        eq_([pair for pair in expected if 10.0 <= pair[0] <= 20.0],
+            self.zset.scorerange(10.0, 20.0))
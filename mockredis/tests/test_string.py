@@ -331,3 +331,103 @@ class TestRedisString(object):
         for x in range(16, 32, 2):
             eq_(0, self.redis.setbit("setbit_key", x, 1))
         eq_(b"\xaa\xaa\xaa\xaa", self.redis.get("setbit_key"))
+
+    def test_bitcount(self):
+        eq_(0, self.redis.bitcount("bitcount_key"))
+        self.redis.set("bitcount_key", b"foobar")
+        eq_(26, self.redis.bitcount("bitcount_key"))
+        eq_(4, self.redis.bitcount("bitcount_key", 0, 0))
+        eq_(6, self.redis.bitcount("bitcount_key", 1, 1))
+        eq_(7, self.redis.bitcount("bitcount_key", -2, -1))
+        eq_(0, self.redis.bitcount("bitcount_key", 5, 2))
+
+        self.redis.setbit("bitcount_key", 100, 1)
+        eq_(27, self.redis.bitcount("bitcount_key"))
+        self.redis.setbit("bitcount_key", 100, 0)
+        eq_(26, self.redis.bitcount("bitcount_key"))
+
+    def test_bitpos(self):
+        eq_(-1, self.redis.bitpos("bitpos_key", 1))
+        eq_(0, self.redis.bitpos("bitpos_key", 0))
+
+        self.redis.set("bitpos_key", b"\xff\xf0\x00")
+        eq_(12, self.redis.bitpos("bitpos_key", 0))
+        eq_(0, self.redis.bitpos("bitpos_key", 1))
+        eq_(8, self.redis.bitpos("bitpos_key", 1, 1))
+        eq_(-1, self.redis.bitpos("bitpos_key", 1, 2))
+        eq_(16, self.redis.bitpos("bitpos_key", 0, 2, -1))
+
+        self.redis.set("bitpos_key", b"\xff\xff")
+        eq_(16, self.redis.bitpos("bitpos_key", 0))
+        eq_(-1, self.redis.bitpos("bitpos_key", 0, 0, -1))
+
+        self.redis.setbit("bitpos_key", 20, 0)
+        eq_(16, self.redis.bitpos("bitpos_key", 0))
+        self.redis.setbit("bitpos_key", 20, 1)
+        eq_(20, self.redis.bitpos("bitpos_key", 1, 2))
+
+    def test_bitop(self):
+        self.redis.set("bitop_1", b"\xff\x0f")
+        self.redis.set("bitop_2", b"\xf0")
+        eq_(2, self.redis.bitop("AND", "bitop_dest", "bitop_1", "bitop_2"))
+        eq_(b"\xf0\x00", self.redis.get("bitop_dest"))
+        eq_(2, self.redis.bitop("or", "bitop_dest", "bitop_1", "bitop_2", "bitop_missing"))
+        eq_(b"\xff\x0f", self.redis.get("bitop_dest"))
+        eq_(2, self.redis.bitop("XOR", "bitop_dest", "bitop_1", "bitop_2"))
+        eq_(b"\x0f\x0f", self.redis.get("bitop_dest"))
+        eq_(2, self.redis.bitop("NOT", "bitop_dest", "bitop_1"))
+        eq_(b"\x00\xf0", self.redis.get("bitop_dest"))
+
+        self.redis.setbit("bitop_1", 17, 1)
+        eq_(3, self.redis.bitop("AND", "bitop_dest", "bitop_1", "bitop_1"))
+        eq_(b"\xff\x0f\x40", self.redis.get("bitop_dest"))
+
+        eq_(0, self.redis.bitop("OR", "bitop_dest", "bitop_missing"))
+        eq_(None, self.redis.get("bitop_dest"))
+
+    def test_bitfield(self):
+        eq_([0, 0], self.redis.bitfield("bitfield_key").get("u8", 0).get("i64", 100).execute())
+        eq_(None, self.redis.get("bitfield_key"))
+
+        eq_([0, 255, -1],
+            self.redis.bitfield("bitfield_key")
+            .set("u8", 0, 255).get("u8", 0).get("i4", 4).execute())
+        eq_(b"\xff", self.redis.get("bitfield_key"))
+
+        eq_([300, 300, 0, -300],
+            self.redis.bitfield("bitfield_key")
+            .incrby("u16", "#1", 300).get("u16", 16).set("i16", 32, -300).get("i16", 32).execute())
+        eq_(b"\xff\x00\x01\x2c\xfe\xd4", self.redis.get("bitfield_key"))
+
+        # unaligned fields
+        eq_([0, 5, 1], self.redis.bitfield("bitfield_key")
+            .set("u3", 49, 5).get("u3", 49).get("u1", 51).execute())
+        eq_(b"\xff\x00\x01\x2c\xfe\xd4\x50", self.redis.get("bitfield_key"))
+
+    def test_bitfield_overflow(self):
+        eq_([250, 4, 4], self.redis.bitfield("bitfield_key")
+            .incrby("u8", 0, 250).incrby("u8", 0, 10).get("u8", 0).execute())
+        eq_([255, 0, 127, -128], self.redis.bitfield("bitfield_key", "SAT")
+            .incrby("u8", 0, 300).incrby("u8", 0, -300)
+            .incrby("i8", 8, 200).incrby("i8", 8, -1000).execute())
+        eq_([None, 0, 2], self.redis.bitfield("bitfield_key")
+            .overflow("FAIL").incrby("u2", 16, 4).set("u2", 16, 2).incrby("u2", 18, 2).execute())
+        eq_([126, 126], self.redis.bitfield("bitfield_key")
+            .incrby("i8", 8, -2, overflow="WRAP").set("i8", 8, -130).execute())
+        eq_([126], self.redis.bitfield("bitfield_key").get("i8", 8).execute())
+
+    def test_bitfield_failed_writes_grow_string(self):
+        eq_([None], self.redis.bitfield("bitfield_key", "FAIL").incrby("u8", 8, 999).execute())
+        eq_(b"\x00\x00", self.redis.get("bitfield_key"))
+
+        eq_([0, None], self.redis.bitfield("other_key")
+            .set("u8", 0, 300).incrby("u8", 8, 999, overflow="FAIL").execute())
+        eq_(b",\x00", self.redis.get("other_key"))
+
+    @raises_response_error
+    def test_bitfield_invalid_type(self):
+        self.redis.bitfield("bitfield_key").set("u8", 0, 1).get("u64", 0).execute()
+
+    @raises_response_error
+    def test_bitfield_invalid_offset(self):
+        self.redis.bitfield("bitfield_key").get("u8", -1).execute()
@@ -18,7 +18,7 @@ setup(name='mockredispy',
           'nose'
       ],
       extras_require={
-          'lua': ['lunatic-python-bugfix==1.1.1'],
+          'lua': ['lupa'],
       },
       tests_require=[
           'redis>=2.9.0'